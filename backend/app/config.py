@@ -1,5 +1,9 @@
 import os
+import atexit
 import logging
+import logging.handlers
+import queue
+from functools import lru_cache
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -8,15 +12,36 @@ load_dotenv()
 
 # Configure logging
 def setup_logging():
-    """Configure application logging"""
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    """Configure application logging
+
+    Records are handed to a queue and written by a background listener thread,
+    so log I/O never blocks the event loop.
+    """
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(
+        fmt="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
         datefmt="%Y-%m-%d %H:%M:%S",
+    ))
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+    # The queue handler only merges args into the message; the listener's handler
+    # applies the real format, otherwise every line would be formatted twice
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.setFormatter(logging.Formatter("%(message)s"))
+
+    logging.basicConfig(
+        level=os.getenv("LOG_LEVEL", "INFO").upper(),
+        handlers=[queue_handler],
     )
 
     # Reduce noise from external libraries
     logging.getLogger("httpx").setLevel(logging.WARNING)
+    # The Azure SDK logs every request and response at INFO
+    logging.getLogger("azure.core.pipeline.policies.http_logging_policy").setLevel(logging.WARNING)
     logging.getLogger("openai").setLevel(logging.WARNING)
     logging.getLogger("uvicorn").setLevel(logging.INFO)
     logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
@@ -44,10 +69,38 @@ class Config:
     BATCH_SIZE_SECONDS = 5  # Process every 5 seconds of audio
     MIN_CHUNKS_FOR_BATCH = 5   # Minimum chunks before processing
     MAX_CHUNKS_FOR_BATCH = 20  # Maximum chunks before forcing processing
+    ACK_COALESCE_N = int(os.getenv("ACK_COALESCE_N", "4"))  # Pending acks that force an early batch_ack
+    ACK_FLUSH_INTERVAL_SECONDS = float(os.getenv("ACK_FLUSH_INTERVAL_SECONDS", "0.05"))  # Max ack delay
+
+    # Background transcription
+    TRANSCRIPTION_WORKERS = int(os.getenv("TRANSCRIPTION_WORKERS", "2"))  # Concurrent Whisper batches across sessions
+    TRANSCRIPTION_QUEUE_SIZE = int(os.getenv("TRANSCRIPTION_QUEUE_SIZE", "4"))  # Batches a session may queue before backpressure
+    WHISPER_TIMEOUT_SECONDS = float(os.getenv("WHISPER_TIMEOUT_SECONDS", "30"))  # Per-request Whisper deadline
+    TRANSCRIPT_SAVE_QUEUE_SIZE = int(os.getenv("TRANSCRIPT_SAVE_QUEUE_SIZE", "1024"))  # Transcript lines awaiting the disk
+    TRANSCRIPT_SAVE_BATCH_SIZE = int(os.getenv("TRANSCRIPT_SAVE_BATCH_SIZE", "16"))  # Lines written per worker thread hop
+
+    # Idle session eviction
+    SESSION_IDLE_TIMEOUT_SECONDS = float(os.getenv("SESSION_IDLE_TIMEOUT_SECONDS", "600"))  # No frames for this long
+    SESSION_REAP_INTERVAL_SECONDS = float(os.getenv("SESSION_REAP_INTERVAL_SECONDS", "60"))  # Sweep period
+
+    # Uvicorn worker processes for `python main.py`. Sessions live entirely in the process
+    # that accepted their websocket, but TRANSCRIPTION_WORKERS is per process, so raising
+    # this multiplies the Whisper concurrency limit. Each worker also keeps its own
+    # transcript listing cache; it is keyed on the files' mtimes and sizes, so appends
+    # made by other workers are still picked up
+    SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", "1"))
+
+    # Threads shared by all sessions for CPU-bound audio chunk decoding
+    AUDIO_EXECUTOR_WORKERS = int(os.getenv("AUDIO_EXECUTOR_WORKERS", str(min(8, os.cpu_count() or 1))))
 
     # File Paths
     TRANSCRIPTIONS_DIR = Path("transcriptions")
+    # Keep a copy of every WAV batch sent to Whisper in TRANSCRIPTIONS_DIR (debugging only)
+    DEBUG_SAVE_AUDIO = os.getenv("DEBUG_SAVE_AUDIO", "").lower() in ("1", "true", "yes")
 
 
-# Create transcriptions directory if it doesn't exist
-Config.TRANSCRIPTIONS_DIR.mkdir(exist_ok=True)
+@lru_cache(maxsize=1)
+def ensure_transcriptions_dir() -> Path:
+    """Create the transcriptions directory on first use and return its path"""
+    Config.TRANSCRIPTIONS_DIR.mkdir(exist_ok=True)
+    return Config.TRANSCRIPTIONS_DIR
@@ -1,6 +1,7 @@
 from .audio import (
     AudioChunk,
     WebSocketMessage,
+    WS_MESSAGE_ADAPTER,
     AudioSession,
     TranscriptionResult,
     TranscriptionResponse,
@@ -17,6 +18,7 @@ __all__ = [
     # Audio models
     "AudioChunk",
     "WebSocketMessage",
+    "WS_MESSAGE_ADAPTER",
     "AudioSession",
     "TranscriptionResult",
     "TranscriptionResponse",
@@ -1,12 +1,12 @@
-from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, TypeAdapter
+from typing import List, Optional, Dict, Any, Union
 from datetime import datetime
 
 
 class AudioChunk(BaseModel):
     """Represents a single audio chunk received from the frontend"""
-    data: List[int]  # Base64 encoded audio data as array of integers
-    timestamp: Optional[str] = None
+    data: str  # Base64 encoded audio data
+    timestamp: Optional[Union[int, str]] = None
     sequenceNumber: int
     mimeType: str = "audio/wav"
 
@@ -14,13 +14,17 @@ class AudioChunk(BaseModel):
 class WebSocketMessage(BaseModel):
     """WebSocket message structure"""
     type: str
-    data: Optional[List[int]] = None
-    timestamp: Optional[str] = None
+    data: Optional[str] = None  # Base64 encoded audio data
+    timestamp: Optional[Union[int, str]] = None  # Client sends epoch milliseconds
     sequenceNumber: Optional[int] = None
     mimeType: Optional[str] = None
     language: Optional[str] = None
 
 
+# Built once and reused: validate_json parses and validates in a single pass
+WS_MESSAGE_ADAPTER = TypeAdapter(WebSocketMessage)
+
+
 class AudioSession(BaseModel):
     """Audio session information"""
     session_id: str
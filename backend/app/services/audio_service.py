@@ -1,23 +1,164 @@
-import json
 import asyncio
+import base64
 import logging
+import struct
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from enum import IntEnum
 from datetime import datetime
-from typing import Dict, Any, List
-from pathlib import Path
-import wave
+from typing import Deque, Dict, Any, Iterable, Iterator, List, Tuple, Union
 import io
 from typing import Optional
 
-import ffmpeg
+import av
+import orjson
 
 from fastapi import WebSocket, WebSocketDisconnect
+from pydantic import ValidationError
 from starlette.websockets import WebSocketState
 
+from ..config import Config
 from ..models.audio import (
-    AudioChunk, AudioSession, WebSocketMessage,
+    AudioChunk, AudioSession, WebSocketMessage, WS_MESSAGE_ADAPTER,
     TranscriptionResult, TranscriptionResponse, RecordingCompleteInfo
 )
 from .azure_blob_service import azure_blob_service
+from .stream_decoder import StreamingDecoder
+from .transcription_service import transcription_service
+
+# Binary audio frame header: sequence number (u32), client timestamp in ms (u64),
+# mime code (u8) and 3 bytes of padding, little-endian. The raw audio follows.
+AUDIO_FRAME_HEADER = struct.Struct("<IQB3x")
+AUDIO_FRAME_MIME_TYPES = {
+    1: "audio/wav",
+    2: "audio/webm",
+    3: "audio/ogg",
+    4: "audio/mpeg",
+    5: "audio/pcm",
+}
+
+
+class SourceFormat(IntEnum):
+    """Container format of a session's audio; values match the binary frame mime codes."""
+    UNKNOWN = 0
+    WAV = 1
+    WEBM = 2
+    OGG = 3
+    MP3 = 4
+    PCM = 5  # raw PCM S16LE 16k mono, already the target format
+
+    @classmethod
+    def from_mime(cls, mime_type: Optional[str]) -> "SourceFormat":
+        """Classify a mime type once so per-chunk dispatch is an integer comparison."""
+        mime_lower = (mime_type or "").lower()
+        if "webm" in mime_lower:
+            return cls.WEBM
+        if "wav" in mime_lower:
+            return cls.WAV
+        if "ogg" in mime_lower:
+            return cls.OGG
+        if "mpeg" in mime_lower or "mp3" in mime_lower:
+            return cls.MP3
+        if "pcm" in mime_lower or "l16" in mime_lower:
+            return cls.PCM
+        return cls.UNKNOWN
+
+    @classmethod
+    def sniff(cls, data: Union[bytes, bytearray, memoryview]) -> "SourceFormat":
+        """Classify the first bytes of a stream by their container magic."""
+        head = bytes(data[:12])
+        if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+            return cls.WAV
+        if head[:4] == b"\x1a\x45\xdf\xa3":  # EBML, i.e. WebM/Matroska
+            return cls.WEBM
+        if head[:4] == b"OggS":
+            return cls.OGG
+        if head[:3] == b"ID3" or (len(head) >= 2 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+            return cls.MP3
+        return cls.UNKNOWN
+
+
+# libav demuxer names for the formats that can be forced on decode
+_AV_FORMAT_NAMES = {
+    SourceFormat.WAV: "wav",
+    SourceFormat.WEBM: "webm",
+    SourceFormat.OGG: "ogg",
+    SourceFormat.MP3: "mp3",
+}
+
+# Formats whose chunks are slices of one container stream rather than standalone
+# files; they run through a per-session StreamingDecoder
+_STREAMED_FORMATS = frozenset((SourceFormat.WEBM, SourceFormat.OGG))
+
+# Canonical 44-byte PCM WAV header: RIFF chunk, 16-byte fmt chunk, data chunk header.
+# Only the RIFF size (offset 4) and data size (offset 40) vary between batches.
+WAV_HEADER = struct.Struct("<4sI4s4sIHHIIHH4sI")
+_WAV_SIZE_FIELD = struct.Struct("<I")
+# RIFF preamble, chunk header and PCM fmt body, for parsing incoming WAV chunks
+_RIFF_HEADER = struct.Struct("<4sI4s")
+_RIFF_CHUNK = struct.Struct("<4sI")
+_WAV_FMT = struct.Struct("<HHIIHH")
+_WAVE_FORMAT_PCM = 1
+
+
+# Pre-encoded invariant parts of the most frequent outbound messages; only the
+# variable fields are serialized per send.
+_BATCH_ACK_PREFIX = b'{"type":"batch_ack","acks":'
+_PONG_PREFIX = b'{"type":"pong","timestamp":'
+
+
+def _encode_batch_ack(acks: List[Dict[str, Any]], processed_at: str, batch_size: int) -> bytes:
+    """Encode a batch_ack message, covering every chunk in ``acks``, from the cached template."""
+    return b"".join((
+        _BATCH_ACK_PREFIX, orjson.dumps(acks),
+        b',"processed_at":', orjson.dumps(processed_at),
+        b',"batch_size":%d}' % batch_size,
+    ))
+
+
+@dataclass(slots=True)
+class SessionState:
+    """Mutable per-connection state for an audio streaming session.
+
+    Kept as a slotted dataclass rather than a pydantic model since it is read and
+    written on every chunk; ``AudioSession`` remains the API-facing model.
+    """
+    websocket: WebSocket
+    start_time: datetime
+    last_processed: float  # event loop (monotonic) time of the last batch
+    last_activity: float = 0.0  # event loop time of the last received frame
+    # Per-chunk metadata as (sequence_number, timestamp, mime_type, decoded_pcm_bytes),
+    # a ring bounded by MAX_CHUNKS_FOR_BATCH and cleared in place after each batch
+    chunks: Deque[Tuple[Optional[int], Any, str, int]] = field(default_factory=deque)
+    # Chunks received since the last batch; unlike the ring this keeps counting while a
+    # batch is deferred, so it matches the audio the next batch actually carries
+    batch_chunks: int = 0
+    batch_deferred: bool = False  # a backpressure warning was logged for the current stall
+    total_chunks: int = 0
+    language: str = "en"  # Default language
+    # PCM aggregation state
+    # Decoded PCM awaiting the next batch, kept as blobs and joined once at batch time
+    pcm_chunks: Deque[bytes] = field(default_factory=deque)
+    pcm_pending_bytes: int = 0
+    source_mime_type: Optional[str] = None
+    source_format: SourceFormat = SourceFormat.UNKNOWN
+    # For streamed (WebM, Ogg) sources a long-lived decoder turns container bytes into PCM
+    decoder: Optional[StreamingDecoder] = None
+    # Every PCM blob of the session (shared with pcm_chunks, not copied) so the full
+    # session audio can be rebuilt upon completion
+    full_pcm_chunks: Deque[bytes] = field(default_factory=deque)
+    full_pcm_bytes: int = 0
+    # Coalesced acknowledgement state
+    pending_acks: List[Dict[str, Any]] = field(default_factory=list)
+    ack_flush_task: Optional[asyncio.Task] = None
+    # Background transcription state: batches are drained in order by one worker per session
+    batch_queue: asyncio.Queue = field(
+        default_factory=lambda: asyncio.Queue(maxsize=Config.TRANSCRIPTION_QUEUE_SIZE)
+    )
+    transcription_worker: Optional[asyncio.Task] = None
+    finalized: bool = False
 
 
 class AudioProcessingService:
@@ -27,141 +168,236 @@ class AudioProcessingService:
         # Set up logger
         self.logger = logging.getLogger(__name__)
         # Global storage for audio sessions
-        self.audio_sessions: Dict[str, Dict[str, Any]] = {}
+        self.audio_sessions: Dict[str, SessionState] = {}
 
         # Batch processing configuration
-        self.BATCH_SIZE_SECONDS = 5  # Process every 5 seconds of audio
-        self.MIN_CHUNKS_FOR_BATCH = 5   # Minimum chunks before processing
-        self.MAX_CHUNKS_FOR_BATCH = 20  # Maximum chunks before forcing processing
-
-        # Create transcriptions directory if it doesn't exist
-        self.TRANSCRIPTIONS_DIR = Path("transcriptions")
-        self.TRANSCRIPTIONS_DIR.mkdir(exist_ok=True)
+        self.BATCH_SIZE_SECONDS = Config.BATCH_SIZE_SECONDS  # Process every 5 seconds of audio
+        self.MIN_CHUNKS_FOR_BATCH = Config.MIN_CHUNKS_FOR_BATCH   # Minimum chunks before processing
+        self.MAX_CHUNKS_FOR_BATCH = Config.MAX_CHUNKS_FOR_BATCH  # Maximum chunks before forcing processing
+        self.ACK_COALESCE_N = Config.ACK_COALESCE_N  # Pending acks that force an early batch_ack
+        self.ACK_FLUSH_INTERVAL_SECONDS = Config.ACK_FLUSH_INTERVAL_SECONDS  # Max delay before a pending ack is sent
+
+        # Whisper calls in flight across all sessions
+        self.TRANSCRIPTION_WORKERS = Config.TRANSCRIPTION_WORKERS
+        self._transcription_slots = asyncio.Semaphore(self.TRANSCRIPTION_WORKERS)
+
+        # Idle session eviction, for connections that vanish without a disconnect
+        self.SESSION_IDLE_TIMEOUT_SECONDS = Config.SESSION_IDLE_TIMEOUT_SECONDS
+        self.SESSION_REAP_INTERVAL_SECONDS = Config.SESSION_REAP_INTERVAL_SECONDS
+        self._session_reaper: Optional[asyncio.Task] = None
+
+        # Bounded pool that keeps chunk decoding off the event loop
+        self._executor = ThreadPoolExecutor(
+            max_workers=Config.AUDIO_EXECUTOR_WORKERS, thread_name_prefix="audio-decode"
+        )
 
         # Target PCM/WAV parameters
         self.TARGET_SAMPLE_RATE = 16000
         self.TARGET_CHANNELS = 1
         self.TARGET_SAMPLE_WIDTH = 2  # bytes (16-bit)
 
-    def _decode_to_pcm(self, audio_bytes: bytes, mime_type: Optional[str]) -> bytes:
-        """Decode an input chunk (WAV or WebM/Opus) to PCM S16LE 16k mono using ffmpeg."""
+        # WAV header for the target format with zeroed sizes, patched per batch
+        block_align = self.TARGET_CHANNELS * self.TARGET_SAMPLE_WIDTH
+        self._wav_header_template = WAV_HEADER.pack(
+            b"RIFF", 0, b"WAVE",
+            b"fmt ", 16, 1, self.TARGET_CHANNELS, self.TARGET_SAMPLE_RATE,
+            self.TARGET_SAMPLE_RATE * block_align, block_align, self.TARGET_SAMPLE_WIDTH * 8,
+            b"data", 0,
+        )
+
+        # Outbound message timestamps, formatted at most once per loop millisecond
+        self._ts_cache: Tuple[int, str] = (-1, "")
+
+    def _now_iso(self) -> str:
+        """Return the current ISO timestamp, reusing the cached string within the same loop millisecond."""
+        tick = int(asyncio.get_running_loop().time() * 1000)
+        cached_tick, cached_iso = self._ts_cache
+        if tick == cached_tick:
+            return cached_iso
+
+        now_iso = datetime.now().isoformat()
+        self._ts_cache = (tick, now_iso)
+        return now_iso
+
+    def _decode_to_pcm(self, audio_bytes: Union[bytes, bytearray, memoryview], source_format: SourceFormat) -> bytes:
+        """Decode an input chunk (WAV or WebM/Opus) to PCM S16LE 16k mono in-process.
+
+        Target-format WAV never gets here: the caller unwraps it with
+        ``_try_strip_wav_header`` first, so this only handles audio libav must convert.
+        """
         if not audio_bytes:
             return b""
 
-        declared_format: Optional[str] = None
-        try:
-            if mime_type:
-                mime_lower = mime_type.lower()
-                if "webm" in mime_lower:
-                    declared_format = "webm"
-                elif "wav" in mime_lower:
-                    declared_format = "wav"
-
-            def run_ffmpeg(input_bytes: bytes, force_format: Optional[str]) -> bytes:
-                input_kwargs = {"f": force_format} if force_format else {}
-                stream = (
-                    ffmpeg
-                    .input("pipe:0", **input_kwargs)
-                    .output(
-                        "pipe:1",
-                        f="s16le",
-                        acodec="pcm_s16le",
-                        ar=self.TARGET_SAMPLE_RATE,
-                        ac=self.TARGET_CHANNELS,
-                    )
-                    .overwrite_output()
-                )
-                out, err = ffmpeg.run(stream, input=input_bytes, capture_stdout=True, capture_stderr=True)
-                return out
+        declared_format = _AV_FORMAT_NAMES.get(source_format)
+        if audio_bytes[:4] == b"RIFF" and audio_bytes[8:12] == b"WAVE":
+            # Sniffed from the header rather than trusting the label
+            declared_format = "wav"
 
+        try:
             # First attempt: use declared input format if available
             try:
-                return run_ffmpeg(audio_bytes, declared_format)
-            except ffmpeg.Error:
-                # Fallback: let ffmpeg auto-detect
-                return run_ffmpeg(audio_bytes, None)
-
-        except ffmpeg.Error as e:
-            preview = e.stderr.decode("utf-8", errors="ignore")[:500] if getattr(e, "stderr", None) else str(e)
-            raise RuntimeError(f"ffmpeg decode error ({declared_format or 'auto'}): {preview}")
-
-    def _wav_from_pcm(self, pcm_bytes: bytes) -> bytes:
-        """Wrap raw PCM S16LE 16k mono bytes into a proper WAV container and return bytes."""
-        buffer = io.BytesIO()
-        with wave.open(buffer, "wb") as wav_file:
-            wav_file.setnchannels(self.TARGET_CHANNELS)
-            wav_file.setsampwidth(self.TARGET_SAMPLE_WIDTH)
-            wav_file.setframerate(self.TARGET_SAMPLE_RATE)
-            wav_file.writeframes(pcm_bytes)
-        return buffer.getvalue()
+                return self._av_decode(audio_bytes, declared_format)
+            except av.FFmpegError:
+                if declared_format is None:
+                    raise
+                # Fallback: let libav auto-detect
+                return self._av_decode(audio_bytes, None)
+        except av.FFmpegError as e:
+            raise RuntimeError(f"Audio decode error ({declared_format or 'auto'}): {e}")
+
+    def _try_strip_wav_header(self, audio_bytes: Union[bytes, bytearray, memoryview]) -> Optional[bytes]:
+        """Return the frames of a WAV chunk that is already PCM S16LE 16k mono, else None.
+
+        Only the RIFF chunk headers are parsed, so this is cheap enough to run on the
+        event loop; anything unexpected returns None and goes through libav instead.
+        """
+        size = len(audio_bytes)
+        if size < _RIFF_HEADER.size:
+            return None
+        riff_id, _, wave_id = _RIFF_HEADER.unpack_from(audio_bytes, 0)
+        if riff_id != b"RIFF" or wave_id != b"WAVE":
+            return None
+
+        frame_bytes = self.TARGET_SAMPLE_WIDTH * self.TARGET_CHANNELS
+        offset = _RIFF_HEADER.size
+        fmt_matches = False
+        while offset + _RIFF_CHUNK.size <= size:
+            chunk_id, chunk_size = _RIFF_CHUNK.unpack_from(audio_bytes, offset)
+            offset += _RIFF_CHUNK.size
+            if chunk_id == b"fmt ":
+                if chunk_size < _WAV_FMT.size or offset + _WAV_FMT.size > size:
+                    return None
+                audio_format, channels, sample_rate, _, _, bits = _WAV_FMT.unpack_from(audio_bytes, offset)
+                if (
+                    audio_format != _WAVE_FORMAT_PCM
+                    or channels != self.TARGET_CHANNELS
+                    or sample_rate != self.TARGET_SAMPLE_RATE
+                    or bits != self.TARGET_SAMPLE_WIDTH * 8
+                ):
+                    return None
+                fmt_matches = True
+            elif chunk_id == b"data":
+                if not fmt_matches:
+                    return None
+                # Streamed WAV may declare a bogus data size; keep whole frames only
+                end = min(offset + chunk_size, size)
+                end -= (end - offset) % frame_bytes
+                return bytes(audio_bytes[offset:end])
+            # Chunks are padded to an even size
+            offset += chunk_size + (chunk_size & 1)
+        return None
+
+    def _av_decode(self, audio_bytes: Union[bytes, bytearray, memoryview], force_format: Optional[str]) -> bytes:
+        """Decode and resample audio to the target PCM format with libav (PyAV)."""
+        resampler = av.AudioResampler(format="s16", layout="mono", rate=self.TARGET_SAMPLE_RATE)
+        frame_bytes = self.TARGET_SAMPLE_WIDTH * self.TARGET_CHANNELS
+        pcm = bytearray()
+
+        with av.open(io.BytesIO(audio_bytes), format=force_format) as container:
+            for frame in container.decode(audio=0):
+                for out_frame in resampler.resample(frame):
+                    # Packed s16 mono lives in plane 0, which may be padded past the samples
+                    pcm += memoryview(out_frame.planes[0])[:out_frame.samples * frame_bytes]
+            # Drain samples still buffered in the resampler
+            for out_frame in resampler.resample(None):
+                pcm += memoryview(out_frame.planes[0])[:out_frame.samples * frame_bytes]
+
+        return bytes(pcm)
+
+    def _wav_header(self, pcm_len: int) -> bytearray:
+        """Return the 44-byte WAV header for ``pcm_len`` bytes of PCM S16LE 16k mono."""
+        header = bytearray(self._wav_header_template)
+        _WAV_SIZE_FIELD.pack_into(header, 4, 36 + pcm_len)
+        _WAV_SIZE_FIELD.pack_into(header, 40, pcm_len)
+        return header
+
+    def _wav_from_pcm_chunks(self, pcm_chunks: Iterable[bytes], pcm_len: int) -> bytes:
+        """Join PCM S16LE 16k mono blobs into a WAV container with a single copy of the samples."""
+        return b"".join((self._wav_header(pcm_len), *pcm_chunks))
 
     async def handle_websocket_connection(self, websocket: WebSocket):
         """Handle WebSocket connection for audio streaming"""
         await websocket.accept()
+        self._ensure_session_reaper()
 
         # Create unique session ID
-        session_id = f"session_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{id(websocket)}"
+        session_id = f"session_{uuid.uuid4().hex}"
 
         try:
             # Initialize session
-            self.audio_sessions[session_id] = {
-                "chunks": [],
-                "start_time": datetime.now(),
-                "last_processed": datetime.now(),
-                "total_chunks": 0,
-                "websocket": websocket,
-                "language": "en",  # Default language
-                # PCM aggregation state
-                "pcm_buffer": bytearray(),
-                "last_batch_offset": 0,
-                "source_mime_type": None,
-                # For WebM/Opus sources we keep container bytes and decode at batch time
-                "webm_buffer": bytearray(),
-                "processed_pcm_offset": 0,
-                # Aggregate buffers so we can rebuild the full session audio upon completion
-                "full_pcm_buffer": bytearray(),
-            }
+            self.audio_sessions[session_id] = SessionState(
+                websocket=websocket,
+                start_time=datetime.now(),
+                last_processed=asyncio.get_running_loop().time(),
+                last_activity=asyncio.get_running_loop().time(),
+                # Only metadata lives here (the audio is in the PCM buffers), so while a
+                # batch is deferred the ring keeping just the newest entries loses no audio;
+                # batch sizes are counted separately in batch_chunks
+                chunks=deque(maxlen=self.MAX_CHUNKS_FOR_BATCH),
+            )
+            session = self.audio_sessions[session_id]
+            session.transcription_worker = asyncio.create_task(self._transcription_worker(session_id, session))
 
             # Send welcome message
-            await websocket.send_text(json.dumps({
+            await websocket.send_bytes(orjson.dumps({
                 "type": "connection",
                 "message": "WebSocket connected successfully",
                 "session_id": session_id,
-                "timestamp": datetime.now().isoformat()
+                "timestamp": self._now_iso()
             }))
 
-            self.logger.info(f"WebSocket connection established for session {session_id} at {datetime.now()}")
+            self.logger.info("WebSocket connection established for session %s", session_id)
 
             while True:
                 try:
-                    # Receive audio chunk data from frontend
-                    data = await websocket.receive_text()
-                    message = json.loads(data)
-
-                    if message.get("type") == "audio_chunk":
-                        # Process audio chunk with batch logic
-                        await self.process_audio_chunk_batch(websocket, session_id, message)
-                    elif message.get("type") == "start_recording":
+                    # Audio arrives as binary frames, control messages as JSON text.
+                    # Binary audio frames never go through pydantic; the low-rate text
+                    # frames are parsed and validated in one pass by a shared TypeAdapter.
+                    frame = await websocket.receive()
+                    if frame["type"] == "websocket.disconnect":
+                        raise WebSocketDisconnect(frame.get("code", 1000))
+                    session.last_activity = asyncio.get_running_loop().time()
+
+                    if frame.get("bytes") is not None:
+                        sequence_number, timestamp, mime_type, audio_bytes = self._parse_audio_frame(frame["bytes"])
+                        await self.process_audio_chunk_batch(
+                            websocket, session_id, audio_bytes, sequence_number, timestamp, mime_type
+                        )
+                        continue
+
+                    message = WS_MESSAGE_ADAPTER.validate_json(frame.get("text") or "")
+
+                    if message.type == "audio_chunk":
+                        # JSON framing fallback with base64 audio; binary frames are preferred
+                        await self.process_audio_chunk_batch(
+                            websocket,
+                            session_id,
+                            base64.b64decode(message.data or ""),
+                            message.sequenceNumber,
+                            message.timestamp,
+                            message.mimeType or "audio/wav",
+                        )
+                    elif message.type == "start_recording":
                         # Store language information for the session
-                        session_language = message.get("language", "en")
-                        self.logger.debug(f"Received start_recording with language: {session_language}")
-                        self.logger.debug(f"Session ID: {session_id}")
-                        self.logger.debug(f"Sessions available: {list(self.audio_sessions.keys())}")
+                        session_language = message.language or "en"
+                        self.logger.debug("Received start_recording with language: %s", session_language)
+                        self.logger.debug("Session ID: %s", session_id)
+                        self.logger.debug("Sessions available: %s", self.audio_sessions.keys())
 
                         if session_id in self.audio_sessions:
-                            old_language = self.audio_sessions[session_id].get("language", "en")
-                            self.audio_sessions[session_id]["language"] = session_language
-                            new_language = self.audio_sessions[session_id].get("language", "en")
-                            self.logger.debug(f"Updated session language from {old_language} to {new_language}")
-                            await websocket.send_text(json.dumps({
+                            old_language = self.audio_sessions[session_id].language
+                            self.audio_sessions[session_id].language = session_language
+                            new_language = self.audio_sessions[session_id].language
+                            self.logger.debug("Updated session language from %s to %s", old_language, new_language)
+                            await websocket.send_bytes(orjson.dumps({
                                 "type": "recording_started",
                                 "message": f"Recording session started with language: {session_language}",
                                 "language": session_language,
-                                "timestamp": datetime.now().isoformat()
+                                "timestamp": self._now_iso()
                             }))
                         else:
-                            self.logger.debug(f"Session {session_id} not found in audio_sessions")
-                    elif message.get("type") == "end_recording":
+                            self.logger.debug("Session %s not found in audio_sessions", session_id)
+                    elif message.type == "end_recording":
                         # Process final batch
                         await self.process_final_batch(session_id)
                         break
@@ -170,220 +406,337 @@ class AudioProcessingService:
                         await self.handle_other_messages(websocket, message)
 
                 except WebSocketDisconnect:
-                    self.logger.info(f"WebSocket disconnected for session {session_id} at {datetime.now()}")
+                    self.logger.info("WebSocket disconnected for session %s", session_id)
                     break
-                except json.JSONDecodeError as e:
-                    self.logger.warning(f"JSON decode error: {e}")
-                    await websocket.send_text(json.dumps({
+                except ValidationError as e:
+                    self.logger.warning("Invalid control message: %s", e)
+                    await websocket.send_bytes(orjson.dumps({
                         "type": "error",
-                        "message": "Invalid JSON format",
-                        "timestamp": datetime.now().isoformat()
+                        "message": "Invalid message format",
+                        "timestamp": self._now_iso()
                     }))
                 except Exception as e:
-                    self.logger.error(f"Error processing message: {e}")
-                    await websocket.send_text(json.dumps({
+                    self.logger.error("Error processing message: %s", e)
+                    await websocket.send_bytes(orjson.dumps({
                         "type": "error",
                         "message": f"Server error: {str(e)}",
-                        "timestamp": datetime.now().isoformat()
+                        "timestamp": self._now_iso()
                     }))
 
         except WebSocketDisconnect:
-            self.logger.info(f"WebSocket connection closed for session {session_id} at {datetime.now()}")
+            self.logger.info("WebSocket connection closed for session %s", session_id)
         except Exception as e:
-            self.logger.error(f"WebSocket error: {e}")
+            self.logger.error("WebSocket error: %s", e)
         finally:
-            await self.finalize_session_recording(session_id)
-            # Cleanup session
-            if session_id in self.audio_sessions:
-                del self.audio_sessions[session_id]
+            await self._close_session(session_id)
+
+    async def _close_session(self, session_id: str):
+        """Finalize a session and release its resources; safe to call from the handler and the reaper."""
+        # Popping first makes whichever caller gets here first the only one to finalize
+        session = self.audio_sessions.pop(session_id, None)
+        if session is None:
+            return
 
-    async def process_audio_chunk_batch(self, websocket: WebSocket, session_id: str, message: Dict[str, Any]):
+        if session.ack_flush_task is not None:
+            session.ack_flush_task.cancel()
+        await self.finalize_session_recording(session_id, session)
+        # Let the worker finish batches already queued (their results are still saved), then exit
+        if session.transcription_worker is not None:
+            await session.batch_queue.put(None)
+
+    def _ensure_session_reaper(self):
+        """Start the idle session reaper on first use (requires a running loop)."""
+        if self._session_reaper is None or self._session_reaper.done():
+            self._session_reaper = asyncio.create_task(self._reap_idle_sessions())
+
+    async def _reap_idle_sessions(self):
+        """Periodically close sessions that have not received a frame within the idle timeout."""
+        while True:
+            await asyncio.sleep(self.SESSION_REAP_INTERVAL_SECONDS)
+            cutoff = asyncio.get_running_loop().time() - self.SESSION_IDLE_TIMEOUT_SECONDS
+            stale = [sid for sid, session in self.audio_sessions.items() if session.last_activity < cutoff]
+            for session_id in stale:
+                session = self.audio_sessions.get(session_id)
+                if session is None:
+                    continue
+                self.logger.warning("Closing idle session %s", session_id)
+                try:
+                    await session.websocket.close()
+                except Exception:
+                    pass
+                try:
+                    await self._close_session(session_id)
+                except Exception as exc:
+                    self.logger.error("Failed to close idle session %s: %s", session_id, exc)
+
+    def _parse_audio_frame(self, frame: bytes) -> Tuple[int, int, str, memoryview]:
+        """Split a binary audio frame into its header fields and a zero-copy view of the audio."""
+        if len(frame) < AUDIO_FRAME_HEADER.size:
+            raise ValueError(f"Audio frame too short: {len(frame)} bytes")
+
+        sequence_number, timestamp, mime_code = AUDIO_FRAME_HEADER.unpack_from(frame, 0)
+        mime_type = AUDIO_FRAME_MIME_TYPES.get(mime_code, "application/octet-stream")
+        return sequence_number, timestamp, mime_type, memoryview(frame)[AUDIO_FRAME_HEADER.size:]
+
+    async def process_audio_chunk_batch(
+        self,
+        websocket: WebSocket,
+        session_id: str,
+        audio_bytes: Union[bytes, memoryview],
+        sequence_number: Optional[int],
+        timestamp: Optional[Any],
+        mime_type: str = "audio/wav",
+    ):
         """Process incoming audio chunk and manage batch processing"""
         try:
-            # Extract audio data
-            audio_data = message.get("data", [])
-            timestamp = message.get("timestamp")
-            sequence_number = message.get("sequenceNumber")
-            mime_type = message.get("mimeType", "audio/wav")
-
-            # Convert bytes array back to bytes
-            audio_bytes = bytes(audio_data)
-
-            self.logger.debug(f"Session {session_id} - Received chunk {sequence_number}: {len(audio_bytes)} bytes")
+            self.logger.debug("Session %s - Received chunk %s: %d bytes", session_id, sequence_number, len(audio_bytes))
 
             # Add chunk to session
             if session_id in self.audio_sessions:
                 session = self.audio_sessions[session_id]
 
-                # Persist the source mime type for diagnostics
-                if not session.get("source_mime_type"):
-                    session["source_mime_type"] = mime_type
-
-                # If source is WebM, buffer container bytes and defer decode until batch time
-                if session["source_mime_type"] and "webm" in session["source_mime_type"].lower():
-                    session["webm_buffer"].extend(audio_bytes)
+                # Persist the source mime type for diagnostics and classify it once;
+                # unlabelled streams are classified by the magic of their first chunk
+                if session.source_mime_type is None:
+                    session.source_mime_type = mime_type
+                    session.source_format = SourceFormat.from_mime(mime_type)
+                    if session.source_format is SourceFormat.UNKNOWN:
+                        session.source_format = SourceFormat.sniff(audio_bytes)
+
+                # If source is a streamed container (WebM, Ogg), feed its bytes into the
+                # session decoder; its PCM lands in the same buffers as decoded WAV chunks
+                if session.source_format in _STREAMED_FORMATS:
+                    if session.decoder is None:
+                        session.decoder = StreamingDecoder(
+                            lambda pcm: self._append_pcm(session, pcm),
+                            container_format=_AV_FORMAT_NAMES[session.source_format],
+                            sample_rate=self.TARGET_SAMPLE_RATE,
+                        )
+                    session.decoder.feed(audio_bytes)
                     decoded_len = 0
+                elif session.source_format is SourceFormat.PCM:
+                    # Raw target-format samples from the browser's AudioWorklet: nothing to decode
+                    pcm_bytes = bytes(audio_bytes)
+                    decoded_len = len(pcm_bytes)
+                    self._append_pcm(session, pcm_bytes)
                 else:
-                    # Decode to target PCM and append to the running buffer (WAV or unknown path)
+                    # Decode to target PCM and append to the running buffer (WAV or unknown path);
+                    # WAV already in the target format is unwrapped inline, without an executor hop
                     try:
-                        pcm_bytes = self._decode_to_pcm(audio_bytes, mime_type)
+                        pcm_bytes = self._try_strip_wav_header(audio_bytes)
+                        if pcm_bytes is None:
+                            pcm_bytes = await asyncio.get_running_loop().run_in_executor(
+                                self._executor, self._decode_to_pcm, audio_bytes, session.source_format
+                            )
                         decoded_len = len(pcm_bytes)
                     except Exception as decode_error:
-                        self.logger.warning(f"PCM decode failed for chunk {sequence_number}: {decode_error}")
-                        await websocket.send_text(json.dumps({
+                        self.logger.warning("PCM decode failed for chunk %s: %s", sequence_number, decode_error)
+                        await websocket.send_bytes(orjson.dumps({
                             "type": "error",
                             "message": f"PCM decode failed for chunk {sequence_number}: {decode_error}",
-                            "timestamp": datetime.now().isoformat()
+                            "timestamp": self._now_iso()
                         }))
-                        return
+                        # The chunk was still received, so it is counted and acknowledged below;
+                        # only its audio is missing from the batch
+                        pcm_bytes = b""
+                        decoded_len = 0
 
-                if not (session["source_mime_type"] and "webm" in session["source_mime_type"].lower()):
-                    session["pcm_buffer"].extend(pcm_bytes)
-                    session["full_pcm_buffer"].extend(pcm_bytes)
+                    if pcm_bytes:
+                        self._append_pcm(session, pcm_bytes)
 
                 # Store only metadata for acknowledgments and counting
-                session["chunks"].append({
-                    "timestamp": timestamp,
-                    "sequence_number": sequence_number,
-                    "mime_type": mime_type,
-                    "decoded_pcm_bytes": decoded_len,
-                })
-                session["total_chunks"] += 1
-
-                # Send acknowledgment
-                await websocket.send_text(json.dumps({
-                    "type": "audio_ack",
-                    "sequenceNumber": sequence_number,
-                    "timestamp": timestamp,
-                    "message": "Audio chunk received",
-                    "processed_at": datetime.now().isoformat(),
-                    "batch_size": len(session["chunks"])
-                }))
-
-                # Check if we should process a batch
-                should_process = (
-                    len(session["chunks"]) >= self.MIN_CHUNKS_FOR_BATCH or  # Minimum chunks reached
-                    len(session["chunks"]) >= self.MAX_CHUNKS_FOR_BATCH or  # Maximum chunks reached
-                    (datetime.now() - session["last_processed"]).seconds >= self.BATCH_SIZE_SECONDS  # Time threshold
+                session.chunks.append((sequence_number, timestamp, mime_type, decoded_len))
+                session.batch_chunks += 1
+                session.total_chunks += 1
+
+                # Acknowledge in coalesced groups rather than once per chunk
+                session.pending_acks.append({"sequenceNumber": sequence_number, "timestamp": timestamp})
+                if session.ack_flush_task is None:
+                    # The first pending ack arms a one-shot timer bounding ack latency
+                    session.ack_flush_task = asyncio.create_task(self._delayed_ack_flush(session))
+
+                # Check if we should process a batch; MIN_CHUNKS_FOR_BATCH <= MAX_CHUNKS_FOR_BATCH,
+                # so the minimum-chunks test also covers the forced maximum. Streamed chunks
+                # carry no PCM of their own, so until the decoder has produced some there is
+                # nothing to cut and the chunks keep counting towards the next batch
+                chunk_count = session.batch_chunks
+                should_process = session.pcm_pending_bytes > 0 and (
+                    chunk_count >= self.MIN_CHUNKS_FOR_BATCH or
+                    (asyncio.get_running_loop().time() - session.last_processed) >= self.BATCH_SIZE_SECONDS  # Time threshold
                 )
+                if should_process and session.batch_queue.full():
+                    # Backpressure: leave acks to the coalescing rules and keep buffering
+                    self._defer_batch(session_id, session)
+                    should_process = False
+
+                if should_process or len(session.pending_acks) >= self.ACK_COALESCE_N:
+                    await self._flush_audio_ack(session)
 
                 if should_process:
                     await self.process_audio_batch(session_id)
 
         except Exception as e:
-            self.logger.error(f"Error processing audio chunk: {e}")
-            await websocket.send_text(json.dumps({
+            self.logger.error("Error processing audio chunk: %s", e)
+            await websocket.send_bytes(orjson.dumps({
                 "type": "error",
                 "message": f"Failed to process audio chunk: {str(e)}",
-                "timestamp": datetime.now().isoformat()
+                "timestamp": self._now_iso()
             }))
 
-    async def process_audio_batch(self, session_id: str):
-        """Process a batch of audio chunks"""
+    def _append_pcm(self, session: SessionState, pcm_bytes: bytes):
+        """Append decoded PCM to the pending batch and the full-session buffer."""
+        session.pcm_chunks.append(pcm_bytes)
+        session.pcm_pending_bytes += len(pcm_bytes)
+        session.full_pcm_chunks.append(pcm_bytes)
+        session.full_pcm_bytes += len(pcm_bytes)
+
+    async def _close_decoder(self, session: SessionState):
+        """Flush the session's streaming decoder so all of its PCM is buffered."""
+        if session.decoder is None:
+            return
+
+        error = await session.decoder.close()
+        if error is not None:
+            self.logger.warning("Streamed %s decode failed for session buffer: %s", session.source_format.name, error)
+
+    async def _flush_audio_ack(self, session: SessionState):
+        """Send one batch_ack covering every chunk received since the previous ack."""
+        if not session.pending_acks:
+            return
+
+        acks = session.pending_acks
+        session.pending_acks = []
+        await session.websocket.send_bytes(_encode_batch_ack(acks, self._now_iso(), session.batch_chunks))
+
+    async def _delayed_ack_flush(self, session: SessionState):
+        """Flush pending acks once the ack flush interval has elapsed."""
+        try:
+            await asyncio.sleep(self.ACK_FLUSH_INTERVAL_SECONDS)
+            session.ack_flush_task = None
+            await self._flush_audio_ack(session)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            self.logger.debug("Deferred ack flush failed: %s", exc)
+
+    async def process_audio_batch(self, session_id: str, wait_for_queue: bool = False):
+        """Cut the pending audio into a batch and queue it for transcription
+
+        When the transcription queue is full the batch is deferred, unless
+        ``wait_for_queue`` is set (final batch), in which case it waits for room.
+        """
         if session_id not in self.audio_sessions:
             return
 
         session = self.audio_sessions[session_id]
-        chunks = session["chunks"]
 
-        if not chunks:
+        if not session.batch_chunks and not session.pcm_pending_bytes:
             return
 
-        try:
-            self.logger.info(f"Processing batch for session {session_id}: {len(chunks)} chunks")
+        if session.batch_queue.full() and not wait_for_queue:
+            self._defer_batch(session_id, session)
+            return
 
-            source_mime = (session.get("source_mime_type") or "").lower()
-            if "webm" in source_mime:
-                # Decode entire WebM buffer to PCM, then take the new slice since last batch
-                webm_bytes = bytes(session["webm_buffer"])
-                try:
-                    pcm_full = self._decode_to_pcm(webm_bytes, "webm")
-                except Exception as e:
-                    self.logger.warning(f"Batch WebM decode failed: {e}")
-                    await session["websocket"].send_text(json.dumps({
-                        "type": "error",
-                        "message": f"Batch WebM decode failed: {e}",
-                        "timestamp": datetime.now().isoformat()
-                    }))
-                    return
+        try:
+            self.logger.info("Processing batch for session %s: %d chunks", session_id, session.batch_chunks)
 
-                start_pcm = session.get("processed_pcm_offset", 0)
-                if len(pcm_full) <= start_pcm:
-                    self.logger.debug("No new PCM produced from WebM for this batch")
-                    return
+            # Build WAV from the PCM added since the last batch (decoded WAV chunks or streamed WebM)
+            pcm_len = session.pcm_pending_bytes
+            if not pcm_len:
+                self.logger.debug("No new PCM to process for this batch")
+                return
 
-                pcm_slice = pcm_full[start_pcm:]
-                wav_bytes = self._wav_from_pcm(pcm_slice)
-                session["processed_pcm_offset"] = len(pcm_full)
-
-                total_size = len(wav_bytes)
-                self.logger.debug(f"Built WAV from WebM PCM slice: {total_size} bytes (pcm {len(pcm_slice)}), source={source_mime}")
-                self.logger.debug(f"WAV header preview: {wav_bytes[:20].hex()}")
-            else:
-                # Build WAV from the newly added PCM slice
-                pcm_buffer: bytearray = session["pcm_buffer"]
-                start_offset: int = session.get("last_batch_offset", 0)
-                end_offset: int = len(pcm_buffer)
-
-                if end_offset <= start_offset:
-                    self.logger.debug("No new PCM to process for this batch")
-                    return
+            # Header and pending blobs are joined in one pass, copying each sample once
+            wav_bytes = self._wav_from_pcm_chunks(session.pcm_chunks, pcm_len)
+            session.pcm_chunks.clear()
+            session.pcm_pending_bytes = 0
 
-                pcm_slice = bytes(pcm_buffer[start_offset:end_offset])
-                wav_bytes = self._wav_from_pcm(pcm_slice)
+            total_size = len(wav_bytes)
 
-                total_size = len(wav_bytes)
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug("Built WAV from PCM slice: %d bytes (pcm %d), source=%s", total_size, pcm_len, session.source_mime_type)
+                self.logger.debug("WAV header preview: %s", wav_bytes[:20].hex())
 
-                self.logger.debug(f"Built WAV from PCM slice: {total_size} bytes (pcm {len(pcm_slice)}), source={session.get('source_mime_type')}")
-                self.logger.debug(f"WAV header preview: {wav_bytes[:20].hex()}")
+            # Clear processed chunk metadata in place
+            chunk_count = session.batch_chunks
+            session.chunks.clear()
+            session.batch_chunks = 0
+            session.batch_deferred = False
+            session.last_processed = asyncio.get_running_loop().time()
 
             # Send batch processing status
-            await session["websocket"].send_text(json.dumps({
+            await session.websocket.send_bytes(orjson.dumps({
                 "type": "batch_processing",
-                "message": f"Processing batch of {len(chunks)} chunks ({total_size} bytes)",
-                "timestamp": datetime.now().isoformat()
-            }))
-
-            # Process the WAV bytes for this batch
-            session_language = session.get("language", "en")
-            self.logger.debug(f"Processing batch for session {session_id} with language: {session_language}")
-            transcription_result = await self.batch_transcribe_audio(wav_bytes, session_id, len(chunks), session_language)
-
-            # Send transcription result
-            await session["websocket"].send_text(json.dumps({
-                "type": "batch_transcription",
-                "text": transcription_result["text"],
-                "confidence": transcription_result["confidence"],
-                "chunk_count": len(chunks),
-                "duration_seconds": transcription_result["duration"],
-                "timestamp": datetime.now().isoformat(),
-                "ready_for_llm": True  # Flag indicating this is ready for LLM processing
+                "message": f"Processing batch of {chunk_count} chunks ({total_size} bytes)",
+                "timestamp": self._now_iso()
             }))
 
-            # Advance offsets and optionally compact buffers
-            if "webm" in source_mime:
-                # Keep the cumulative webm_buffer; optional future compaction could preserve only key headers + tail
-                pass
-            else:
-                session["last_batch_offset"] = end_offset
-                # Compact buffer: drop processed PCM and reset offset
-                del pcm_buffer[:end_offset]
-                session["last_batch_offset"] = 0
-
-            # Clear processed chunk metadata
-            session["chunks"] = []
-            session["last_processed"] = datetime.now()
-
-            self.logger.info(f"Batch processing complete for session {session_id}")
+            # Hand the WAV bytes to the session's transcription worker so ingest keeps draining frames
+            await session.batch_queue.put((wav_bytes, chunk_count))
 
         except Exception as e:
-            self.logger.error(f"Error processing batch: {e}")
-            await session["websocket"].send_text(json.dumps({
+            self.logger.error("Error processing batch: %s", e)
+            await session.websocket.send_bytes(orjson.dumps({
                 "type": "error",
                 "message": f"Batch processing failed: {str(e)}",
-                "timestamp": datetime.now().isoformat()
+                "timestamp": self._now_iso()
             }))
 
+    def _defer_batch(self, session_id: str, session: SessionState):
+        """Keep the audio buffered so it rolls into the next batch; warns once per stall."""
+        if not session.batch_deferred:
+            session.batch_deferred = True
+            self.logger.warning("Transcription queue full; deferring batch for session %s", session_id)
+
+    async def _transcription_worker(self, session_id: str, session: SessionState):
+        """Transcribe a session's queued batches in order and send the results back; None stops the worker."""
+        while True:
+            item = await session.batch_queue.get()
+            try:
+                if item is None:
+                    return
+
+                wav_bytes, chunk_count = item
+                async with self._transcription_slots:
+                    await self._transcribe_batch(session_id, session, wav_bytes, chunk_count)
+            except Exception as e:
+                self.logger.error("Error processing batch: %s", e)
+                if session.websocket.application_state == WebSocketState.CONNECTED:
+                    try:
+                        await session.websocket.send_bytes(orjson.dumps({
+                            "type": "error",
+                            "message": f"Batch processing failed: {str(e)}",
+                            "timestamp": self._now_iso()
+                        }))
+                    except Exception:
+                        pass
+            finally:
+                session.batch_queue.task_done()
+
+    async def _transcribe_batch(self, session_id: str, session: SessionState, wav_bytes: bytes, chunk_count: int):
+        """Transcribe one queued batch and send the result to the session's websocket"""
+        session_language = session.language
+        self.logger.debug("Processing batch for session %s with language: %s", session_id, session_language)
+        transcription_result = await self.batch_transcribe_audio(wav_bytes, session_id, chunk_count, session_language)
+
+        if session.websocket.application_state != WebSocketState.CONNECTED:
+            self.logger.info("Session %s disconnected before its batch transcription was ready", session_id)
+            return
+
+        # Send transcription result; this is the one outbound message validated
+        # through its pydantic model, once per batch rather than per chunk
+        response = TranscriptionResponse(
+            text=transcription_result["text"],
+            confidence=transcription_result["confidence"],
+            chunk_count=chunk_count,
+            duration_seconds=transcription_result["duration"],
+            timestamp=self._now_iso(),
+            ready_for_llm=True,  # Flag indicating this is ready for LLM processing
+        )
+        await session.websocket.send_bytes(response.model_dump_json().encode())
+
+        self.logger.info("Batch processing complete for session %s", session_id)
+
     async def process_final_batch(self, session_id: str):
         """Process any remaining chunks when recording ends"""
         if session_id not in self.audio_sessions:
@@ -391,20 +744,28 @@ class AudioProcessingService:
 
         session = self.audio_sessions[session_id]
 
-        if session["chunks"]:
-            await self.process_audio_batch(session_id)
+        await self._flush_audio_ack(session)
+        # Drain the WebM decoder so the tail of the stream is part of the final batch
+        await self._close_decoder(session)
+        if session.batch_chunks or session.pcm_pending_bytes:
+            await self.process_audio_batch(session_id, wait_for_queue=True)
 
-        websocket = session.get("websocket")
+        # Wait for queued batches and their transcript lines so both are done before
+        # recording_complete; the client may fetch the transcript as soon as it arrives
+        await session.batch_queue.join()
+        await transcription_service.flush_session_saves(session_id)
+
+        websocket = session.websocket
         if websocket and websocket.application_state == WebSocketState.CONNECTED:
             try:
-                await websocket.send_text(json.dumps({
+                await websocket.send_bytes(orjson.dumps({
                     "type": "recording_complete",
                     "message": "Recording session completed",
-                    "total_chunks_processed": session["total_chunks"],
-                    "timestamp": datetime.now().isoformat()
+                    "total_chunks_processed": session.total_chunks,
+                    "timestamp": self._now_iso()
                 }))
             except Exception as exc:
-                self.logger.warning(f"Failed to send recording_complete message for session {session_id}: {exc}")
+                self.logger.warning("Failed to send recording_complete message for session %s: %s", session_id, exc)
 
         # Close the websocket to force a fresh session on next recording
         if websocket and websocket.client_state == WebSocketState.CONNECTED:
@@ -413,94 +774,76 @@ class AudioProcessingService:
             except Exception:
                 pass
 
-    async def finalize_session_recording(self, session_id: str):
+    async def finalize_session_recording(self, session_id: str, session: SessionState):
         """Persist the complete session audio to Azure blob storage."""
-        session = self.audio_sessions.get(session_id)
-        if not session:
-            return
-
-        if session.get("finalized"):
+        if session.finalized:
             return
 
         try:
-            wav_bytes = await self._build_full_wav(session)
-            if not wav_bytes:
-                self.logger.info(f"No audio captured for session {session_id}; skipping upload")
+            # Sessions that disconnect without end_recording still have a decoder to drain
+            await self._close_decoder(session)
+
+            # Snapshot the buffer references together with their length: the upload awaits
+            # between parts, and a chunk decode still in flight may append to the live deque
+            pcm_chunks = tuple(session.full_pcm_chunks)
+            pcm_len = session.full_pcm_bytes
+            if not pcm_len:
+                self.logger.info("No audio captured for session %s; skipping upload", session_id)
                 return
 
             metadata = {
-                "language": session.get("language", "unknown"),
-                "source_mime": session.get("source_mime_type") or "unknown",
-                "total_chunks": str(session.get("total_chunks", 0)),
-                "started_at": session.get("start_time").isoformat() if session.get("start_time") else "",
+                "language": session.language,
+                "source_mime": session.source_mime_type or "unknown",
+                "total_chunks": str(session.total_chunks),
+                "started_at": session.start_time.isoformat() if session.start_time else "",
             }
 
             blob_name = await azure_blob_service.upload_session_audio(
                 session_id=session_id,
-                wav_bytes=wav_bytes,
-                language=session.get("language"),
+                wav_data=self._wav_stream(pcm_chunks, pcm_len),
+                length=WAV_HEADER.size + pcm_len,
+                language=session.language,
                 metadata=metadata,
             )
 
             if blob_name:
-                self.logger.info(f"Session {session_id} recording uploaded to {blob_name}")
-            session["finalized"] = True
+                self.logger.info("Session %s recording uploaded to %s", session_id, blob_name)
+            session.finalized = True
         except Exception as exc:
-            self.logger.error(f"Failed to upload session {session_id} recording: {exc}")
+            self.logger.error("Failed to upload session %s recording: %s", session_id, exc)
 
-    async def _build_full_wav(self, session: Dict[str, Any]) -> Optional[bytes]:
-        source_mime = (session.get("source_mime_type") or "").lower()
+    def _wav_stream(self, pcm_chunks: Iterable[bytes], pcm_len: int) -> Iterator[bytes]:
+        """Yield a WAV of ``pcm_len`` bytes of PCM as its header followed by the PCM blobs, uncopied."""
+        yield bytes(self._wav_header(pcm_len))
+        yield from pcm_chunks
 
-        if "webm" in source_mime:
-            if not session.get("webm_buffer"):
-                return None
-            try:
-                pcm_bytes = self._decode_to_pcm(bytes(session["webm_buffer"]), "webm")
-            except Exception as exc:
-                self.logger.warning(f"Failed to decode WebM buffer for full session: {exc}")
-                return None
-        else:
-            pcm_bytes = bytes(session.get("full_pcm_buffer") or b"")
-
-        if not pcm_bytes:
-            return None
-
-        return self._wav_from_pcm(pcm_bytes)
-
-    async def handle_other_messages(self, websocket: WebSocket, message: Dict[str, Any]):
+    async def handle_other_messages(self, websocket: WebSocket, message: WebSocketMessage):
         """Handle other types of WebSocket messages"""
-        message_type = message.get("type")
+        message_type = message.type
 
         if message_type == "ping":
-            await websocket.send_text(json.dumps({
-                "type": "pong",
-                "timestamp": datetime.now().isoformat()
-            }))
+            await websocket.send_bytes(_PONG_PREFIX + orjson.dumps(self._now_iso()) + b"}")
         elif message_type == "start_recording":
-            await websocket.send_text(json.dumps({
+            await websocket.send_bytes(orjson.dumps({
                 "type": "recording_started",
                 "message": "Recording session started",
-                "timestamp": datetime.now().isoformat()
+                "timestamp": self._now_iso()
             }))
         elif message_type == "stop_recording":
-            await websocket.send_text(json.dumps({
+            await websocket.send_bytes(orjson.dumps({
                 "type": "recording_stopped",
                 "message": "Recording session stopped",
-                "timestamp": datetime.now().isoformat()
+                "timestamp": self._now_iso()
             }))
         else:
-            await websocket.send_text(json.dumps({
+            await websocket.send_bytes(orjson.dumps({
                 "type": "unknown_message",
                 "message": f"Unknown message type: {message_type}",
-                "timestamp": datetime.now().isoformat()
+                "timestamp": self._now_iso()
             }))
 
     async def batch_transcribe_audio(self, audio_bytes: bytes, session_id: str, chunk_count: int, language: str = "en") -> Dict[str, Any]:
         """Transcribe combined audio using OpenAI Whisper API"""
-        # Import here to avoid circular imports
-        from .transcription_service import TranscriptionService
-
-        transcription_service = TranscriptionService()
         return await transcription_service.transcribe_audio(audio_bytes, session_id, chunk_count, language)
 
 
@@ -5,14 +5,24 @@ from __future__ import annotations
 import asyncio
 import logging
 import os
-from datetime import datetime
-from typing import Dict, Optional
+import re
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional, Union
 
-from azure.storage.blob import BlobServiceClient, ContentSettings
+from azure.core.exceptions import ResourceExistsError
+from azure.storage.blob import ContentSettings
+from azure.storage.blob.aio import BlobServiceClient, ContainerClient
+
+# Anything other than ASCII alphanumerics, dashes and underscores in a metadata key
+_UNSAFE_KEY_CHARS = re.compile(r"[^a-z0-9_-]")
 
 
 class AzureBlobStorageService:
-    """Uploads finalized audio recordings to Azure Blob Storage with metadata."""
+    """Uploads finalized audio recordings to Azure Blob Storage with metadata.
+
+    A single async client is kept for the process lifetime, so its aiohttp connection
+    pool (and the TLS sessions in it) is reused across uploads; call ``close`` on shutdown.
+    """
 
     def __init__(self):
         self.logger = logging.getLogger(__name__)
@@ -22,13 +32,14 @@ class AzureBlobStorageService:
         self.container_name = os.getenv("AZURE_STORAGE_CONTAINER", "recordings")
 
         self._blob_service_client: Optional[BlobServiceClient] = None
-        self._container_client = None
+        self._container_client: Optional[ContainerClient] = None
+        self._container_lock = asyncio.Lock()
 
         if self.is_configured:
             try:
                 self._blob_service_client = self._create_blob_service_client()
             except Exception as exc:  # pragma: no cover - configuration failures logged for diagnostics
-                self.logger.error(f"Failed to initialize Azure BlobServiceClient: {exc}")
+                self.logger.error("Failed to initialize Azure BlobServiceClient: %s", exc)
                 self._blob_service_client = None
 
     @property
@@ -43,39 +54,59 @@ class AzureBlobStorageService:
         account_url = f"https://{self.account_name}.blob.core.windows.net"
         return BlobServiceClient(account_url=account_url, credential=self.account_key)
 
-    def _ensure_container(self):
+    async def initialize(self):
+        """Provision the container once at startup so uploads skip the create round-trip."""
+        if not self.is_configured:
+            return
+
+        try:
+            await self._ensure_container()
+        except Exception as exc:
+            # Retried on the first upload
+            self.logger.error("Failed to prepare Azure Blob container '%s': %s", self.container_name, exc)
+
+    async def _ensure_container(self) -> ContainerClient:
         if self._container_client is not None:
             return self._container_client
 
-        if not self._blob_service_client:
-            raise RuntimeError("Azure BlobServiceClient is unavailable; check configuration")
+        async with self._container_lock:
+            if self._container_client is not None:
+                return self._container_client
 
-        container_client = self._blob_service_client.get_container_client(self.container_name)
+            if not self._blob_service_client:
+                raise RuntimeError("Azure BlobServiceClient is unavailable; check configuration")
 
-        try:
-            container_client.create_container()
-            self.logger.info(f"Created Azure Blob container '{self.container_name}'")
-        except Exception as exc:
-            # Ignore container already exists errors; re-raise others
-            from azure.core.exceptions import ResourceExistsError
+            container_client = self._blob_service_client.get_container_client(self.container_name)
 
-            if isinstance(exc, ResourceExistsError):
+            try:
+                await container_client.create_container()
+                self.logger.info("Created Azure Blob container '%s'", self.container_name)
+            except ResourceExistsError:
+                # Container already exists; any other provisioning error propagates
                 pass
-            else:  # pragma: no cover - surface unexpected provisioning issues
-                raise
 
-        self._container_client = container_client
-        return container_client
+            self._container_client = container_client
+            return container_client
+
+    async def close(self):
+        """Close the pooled HTTP transport of the Azure client."""
+        if self._blob_service_client is not None:
+            await self._blob_service_client.close()
 
     async def upload_session_audio(
         self,
         session_id: str,
-        wav_bytes: bytes,
+        wav_data: Union[bytes, Iterable[bytes]],
         language: Optional[str],
         metadata: Optional[Dict[str, str]] = None,
+        length: Optional[int] = None,
     ) -> Optional[str]:
-        """Async wrapper to upload a WAV recording for a session.
+        """Upload a WAV recording for a session.
 
+        The upload runs on the event loop through the ``azure.storage.blob.aio`` client;
+        it awaits network I/O only, so other sessions keep streaming meanwhile.
+        ``wav_data`` may be the complete WAV or an iterable of its parts; pass ``length``
+        with an iterable so the SDK can stage it in blocks without joining it first.
         Returns the blob name on success, None when configuration is missing.
         """
 
@@ -83,55 +114,42 @@ class AzureBlobStorageService:
             self.logger.info("Azure blob storage is not configured; skipping upload")
             return None
 
-        loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(
-            None,
-            lambda: self._upload_session_audio_sync(session_id, wav_bytes, language, metadata or {}),
-        )
-
-    # -------------------------
-    # Internal helpers
-    # -------------------------
-
-    def _upload_session_audio_sync(
-        self,
-        session_id: str,
-        wav_bytes: bytes,
-        language: Optional[str],
-        metadata: Dict[str, str],
-    ) -> str:
-        container_client = self._ensure_container()
+        container_client = self._container_client or await self._ensure_container()
 
-        timestamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%fZ")
-        blob_name = f"recordings/{session_id}_{timestamp}.wav"
+        uploaded_at = datetime.now(timezone.utc)
+        blob_name = f"recordings/{session_id}_{uploaded_at:%Y%m%dT%H%M%S%fZ}.wav"
 
         blob_metadata = self._normalize_metadata({
             "session_id": session_id,
             "language": language or "unknown",
-            "uploaded_at": datetime.utcnow().isoformat(),
+            "uploaded_at": uploaded_at.isoformat(),
             **(metadata or {}),
         })
 
         content_settings = ContentSettings(content_type="audio/wav")
 
-        container_client.upload_blob(
+        await container_client.upload_blob(
             name=blob_name,
-            data=wav_bytes,
+            data=wav_data,
+            length=length,
             overwrite=True,
             metadata=blob_metadata,
             content_settings=content_settings,
         )
 
-        self.logger.info(f"Uploaded session recording to Azure blob '{blob_name}' with metadata {blob_metadata}")
+        self.logger.info("Uploaded session recording to Azure blob '%s' with metadata %s", blob_name, blob_metadata)
         return blob_name
 
+    # -------------------------
+    # Internal helpers
+    # -------------------------
+
     @staticmethod
     def _normalize_metadata(metadata: Dict[str, Optional[str]]) -> Dict[str, str]:
         """Azure metadata keys must be ASCII alphanumerics or dashes, lowercase recommended."""
 
         def sanitize_key(key: str) -> str:
-            safe = ''.join(ch if ch.isalnum() or ch in ('-', '_') else '_' for ch in key.lower())
-            return safe[:1024]
+            return _UNSAFE_KEY_CHARS.sub("_", key.lower())[:1024]
 
         def sanitize_value(value: Optional[str]) -> str:
             return (value if value is not None else "").strip()[:2048]
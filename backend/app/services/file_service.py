@@ -1,37 +1,111 @@
-import json
+import os
+import threading
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
+import orjson
+
+from ..config import Config, ensure_transcriptions_dir
 from ..models.responses import TranscriptionFileInfo, TranscriptionListResponse
 
+# Session transcripts are append-only JSONL, one line per batch, with a small JSON
+# sidecar for the session header fields; older sessions may still be single JSON files
+SESSION_FILE_PREFIX = "transcription_session_"
+SESSION_FILE_SUFFIX = ".jsonl"
+SESSION_META_SUFFIX = "_meta.json"
+
 
 class FileManagementService:
     """Service for managing transcription files and directory operations"""
 
     def __init__(self):
-        # Create transcriptions directory if it doesn't exist
-        self.TRANSCRIPTIONS_DIR = Path("transcriptions")
-        self.TRANSCRIPTIONS_DIR.mkdir(exist_ok=True)
+        # The directory itself is created lazily on first use
+        self.TRANSCRIPTIONS_DIR = Config.TRANSCRIPTIONS_DIR
+
+        # Cached listing, keyed on each session file's name, mtime and size. Appends
+        # don't touch the directory mtime and may come from another worker process,
+        # so only the per-file stats the scan already collects say the cache is current
+        self._listing_lock = threading.Lock()
+        self._listing: Optional[TranscriptionListResponse] = None
+        self._listing_key: Optional[tuple] = None
+
+    def session_transcript_path(self, session_id: str) -> Path:
+        """Path of a session's append-only JSONL transcript"""
+        return self.TRANSCRIPTIONS_DIR / f"{SESSION_FILE_PREFIX}{session_id}{SESSION_FILE_SUFFIX}"
+
+    def session_meta_path(self, session_id: str) -> Path:
+        """Path of a session's header sidecar (session_id, created_at, language)"""
+        return self.TRANSCRIPTIONS_DIR / f"{SESSION_FILE_PREFIX}{session_id}{SESSION_META_SUFFIX}"
+
+    def load_session(self, session_id: str) -> Dict[str, Any]:
+        """Assemble a session document from its JSONL transcript and header sidecar"""
+        meta_path = self.session_meta_path(session_id)
+        session_data = orjson.loads(meta_path.read_bytes()) if meta_path.exists() else {"session_id": session_id}
+
+        transcriptions = []
+        with open(self.session_transcript_path(session_id), "rb") as jsonl_file:
+            for line in jsonl_file:
+                try:
+                    transcriptions.append(orjson.loads(line))
+                except orjson.JSONDecodeError:
+                    # Blank or partially written line (e.g. interrupted append)
+                    continue
+
+        if transcriptions:
+            session_data["last_updated"] = transcriptions[-1].get("processing_timestamp")
+            session_data["language"] = transcriptions[-1].get("language", session_data.get("language"))
+        session_data["transcriptions"] = transcriptions
+        return session_data
+
+    def invalidate_listing(self):
+        """Drop the cached listing after a transcript file was written"""
+        with self._listing_lock:
+            self._listing = None
+            self._listing_key = None
 
     def list_transcription_files(self) -> TranscriptionListResponse:
         """List all transcription files"""
         try:
-            transcription_files = []
-            for file_path in self.TRANSCRIPTIONS_DIR.glob("transcription_session_*.json"):
-                file_stat = file_path.stat()
-                transcription_files.append(TranscriptionFileInfo(
-                    filename=file_path.name,
+            ensure_transcriptions_dir()
+
+            # One directory pass; each entry is stat'ed once and sorted on the raw ctime
+            with os.scandir(self.TRANSCRIPTIONS_DIR) as entries:
+                session_files = [
+                    (entry.name, entry.stat()) for entry in entries
+                    if entry.name.startswith(SESSION_FILE_PREFIX) and (
+                        entry.name.endswith(SESSION_FILE_SUFFIX)
+                        or (entry.name.endswith(".json") and not entry.name.endswith(SESSION_META_SUFFIX))
+                    )
+                ]
+            session_files.sort(key=lambda item: item[1].st_ctime, reverse=True)
+
+            listing_key = tuple(
+                (name, file_stat.st_mtime_ns, file_stat.st_size) for name, file_stat in session_files
+            )
+            with self._listing_lock:
+                if self._listing is not None and self._listing_key == listing_key:
+                    return self._listing
+
+            transcription_files = [
+                TranscriptionFileInfo(
+                    filename=name,
                     size_bytes=file_stat.st_size,
                     created=datetime.fromtimestamp(file_stat.st_ctime).isoformat(),
                     modified=datetime.fromtimestamp(file_stat.st_mtime).isoformat()
-                ))
+                )
+                for name, file_stat in session_files
+            ]
 
-            return TranscriptionListResponse(
-                transcriptions=sorted(transcription_files, key=lambda x: x.created, reverse=True),
+            listing = TranscriptionListResponse(
+                transcriptions=transcription_files,
                 total_count=len(transcription_files),
                 directory=str(self.TRANSCRIPTIONS_DIR)
             )
+            with self._listing_lock:
+                self._listing = listing
+                self._listing_key = listing_key
+            return listing
         except Exception as e:
             return TranscriptionListResponse(
                 transcriptions=[],
@@ -47,10 +121,11 @@ class FileManagementService:
             if not file_path.exists():
                 return {"error": "Transcription file not found"}
 
-            with open(file_path, "r", encoding="utf-8") as json_file:
-                transcription_data = json.load(json_file)
+            if filename.startswith(SESSION_FILE_PREFIX) and filename.endswith(SESSION_FILE_SUFFIX):
+                return self.load_session(filename[len(SESSION_FILE_PREFIX):-len(SESSION_FILE_SUFFIX)])
 
-            return transcription_data
+            # Legacy single-document session file
+            return orjson.loads(file_path.read_bytes())
 
         except Exception as e:
             return {"error": str(e)}
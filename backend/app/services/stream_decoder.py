@@ -0,0 +1,120 @@
+"""Incremental decoder for containerized audio streams such as MediaRecorder WebM/Opus."""
+
+from __future__ import annotations
+
+import asyncio
+import io
+import logging
+import threading
+from collections import deque
+from typing import Callable, Deque, Optional, Union
+
+import av
+
+
+class _ChunkFeed(io.RawIOBase):
+    """Non-seekable byte stream fed from the event loop and read by the decoder thread.
+
+    ``readinto`` blocks until more bytes are fed or the feed is ended, at which
+    point it reports EOF to libav.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: Deque[memoryview] = deque()
+        self._current = memoryview(b"")
+        self._ended = False
+        self._cond = threading.Condition()
+
+    def readable(self) -> bool:
+        return True
+
+    def feed(self, data: Union[bytes, memoryview]):
+        with self._cond:
+            self._chunks.append(memoryview(data))
+            self._cond.notify()
+
+    def end(self):
+        with self._cond:
+            self._ended = True
+            self._cond.notify()
+
+    def readinto(self, buffer) -> int:
+        with self._cond:
+            while not self._current:
+                if self._chunks:
+                    self._current = self._chunks.popleft()
+                elif self._ended:
+                    return 0
+                else:
+                    self._cond.wait()
+
+        size = min(len(buffer), len(self._current))
+        buffer[:size] = self._current[:size]
+        self._current = self._current[size:]
+        return size
+
+
+class StreamingDecoder:
+    """Decode one growing audio stream to PCM S16LE mono on a dedicated thread.
+
+    Container bytes are passed to ``feed`` as they arrive; decoded PCM is handed to
+    ``on_pcm`` on the event loop, in stream order. A single demuxer and resampler
+    live for the whole stream, so each byte is decoded exactly once.
+    """
+
+    def __init__(
+        self,
+        on_pcm: Callable[[bytes], None],
+        container_format: str = "webm",
+        sample_rate: int = 16000,
+    ):
+        self.logger = logging.getLogger(__name__)
+        self._on_pcm = on_pcm
+        self._format = container_format
+        self._sample_rate = sample_rate
+        self._loop = asyncio.get_running_loop()
+        self._feed = _ChunkFeed()
+        self._done: asyncio.Future = self._loop.create_future()
+        self._thread = threading.Thread(target=self._run, name="stream-decoder", daemon=True)
+        self._thread.start()
+
+    def feed(self, data: Union[bytes, memoryview]):
+        """Queue new container bytes for decoding (dropped once the decoder has stopped)."""
+        if not self._done.done():
+            self._feed.feed(data)
+
+    async def close(self) -> Optional[Exception]:
+        """End the stream and wait until all remaining PCM has been delivered; returns the decode error, if any."""
+        self._feed.end()
+        return await self._done
+
+    def _run(self):
+        error: Optional[Exception] = None
+        try:
+            resampler = av.AudioResampler(format="s16", layout="mono", rate=self._sample_rate)
+            # Minimal probing: Opus-in-WebM headers carry everything the decoder needs,
+            # so the first PCM is produced without waiting for seconds of input
+            with av.open(
+                self._feed, format=self._format, options={"probesize": "32", "analyzeduration": "0"}
+            ) as container:
+                for frame in container.decode(audio=0):
+                    self._emit(resampler.resample(frame))
+                self._emit(resampler.resample(None))
+        except Exception as exc:
+            self.logger.warning("Streaming %s decode stopped: %s", self._format, exc)
+            error = exc
+        finally:
+            # Scheduled after every PCM callback, so awaiting close() observes all audio
+            self._loop.call_soon_threadsafe(self._set_done, error)
+
+    def _emit(self, frames):
+        for frame in frames:
+            # Packed s16 mono lives in plane 0, which may be padded past the samples
+            pcm = bytes(memoryview(frame.planes[0])[:frame.samples * 2])
+            if pcm:
+                self._loop.call_soon_threadsafe(self._on_pcm, pcm)
+
+    def _set_done(self, error: Optional[Exception]):
+        if not self._done.done():
+            self._done.set_result(error)
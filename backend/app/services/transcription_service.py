@@ -1,18 +1,61 @@
-import os
+import asyncio
+import collections
+import itertools
 import logging
+import os
+import struct
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 
+import httpx
 import openai
-from dotenv import load_dotenv
+import orjson
+
+from ..config import Config, ensure_transcriptions_dir
+from .file_service import file_service
+
+# Initialize OpenAI client; async so Whisper round-trips never block the event loop.
+# One HTTP/2 connection pool is shared by every session, so batches reuse TLS
+# connections and concurrent uploads multiplex over them. Batches are a few seconds
+# of audio, so a stalled request is cut off long before the SDK's 10 minute default
+# would free its transcription slot.
+client = openai.AsyncOpenAI(
+    api_key=Config.OPENAI_API_KEY,
+    max_retries=2,
+    timeout=httpx.Timeout(Config.WHISPER_TIMEOUT_SECONDS, connect=5.0),
+    http_client=openai.DefaultAsyncHttpxClient(
+        http2=True,
+        # Idle connections are kept for 5 minutes so the startup warmup's stays usable
+        limits=httpx.Limits(max_keepalive_connections=32, max_connections=64, keepalive_expiry=300.0),
+    ),
+)
+
+# RIFF chunk header and the leading fields of a fmt chunk
+_RIFF_CHUNK = struct.Struct("<4sI")
+_WAV_FMT = struct.Struct("<HHIIHH")
+
 
-# Load environment variables
-load_dotenv()
+def _wav_params(audio_bytes: bytes) -> Tuple[int, int, int, int, int]:
+    """Return (channels, sample_rate, byte_rate, bits_per_sample, data_size) of an in-memory WAV."""
+    if audio_bytes[:4] != b"RIFF" or audio_bytes[8:12] != b"WAVE":
+        raise ValueError("not a RIFF/WAVE file")
 
-# Initialize OpenAI client
-openai.api_key = os.getenv("OPENAI_API_KEY")
-client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    fmt = None
+    offset = 12
+    while offset + _RIFF_CHUNK.size <= len(audio_bytes):
+        chunk_id, chunk_size = _RIFF_CHUNK.unpack_from(audio_bytes, offset)
+        offset += _RIFF_CHUNK.size
+        if chunk_id == b"fmt ":
+            fmt = _WAV_FMT.unpack_from(audio_bytes, offset)
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise ValueError("data chunk before fmt chunk")
+            _, channels, sample_rate, byte_rate, _, bits = fmt
+            return channels, sample_rate, byte_rate, bits, min(chunk_size, len(audio_bytes) - offset)
+        # Chunks are padded to an even size
+        offset += chunk_size + (chunk_size & 1)
+    raise ValueError("no data chunk")
 
 
 class TranscriptionService:
@@ -20,53 +63,77 @@ class TranscriptionService:
 
     def __init__(self):
         self.logger = logging.getLogger(__name__)
-        # Create transcriptions directory if it doesn't exist
-        self.TRANSCRIPTIONS_DIR = Path("transcriptions")
-        self.TRANSCRIPTIONS_DIR.mkdir(exist_ok=True)
+        # The directory itself is created lazily on first use
+        self.TRANSCRIPTIONS_DIR = Config.TRANSCRIPTIONS_DIR
+        # Distinguishes debug audio dumps of one session without reading the clock
+        self._debug_audio_counter = itertools.count()
+        # Transcript lines waiting to be written by the background save worker
+        self.SAVE_BATCH_SIZE = Config.TRANSCRIPT_SAVE_BATCH_SIZE
+        self._save_queue: asyncio.Queue = asyncio.Queue(maxsize=Config.TRANSCRIPT_SAVE_QUEUE_SIZE)
+        self._save_worker: Optional[asyncio.Task] = None
+        # Queued-but-unwritten lines per session, so a session can wait for its own lines
+        self._pending_saves: collections.Counter = collections.Counter()
+        self._saves_written = asyncio.Condition()
+
+    async def warmup(self):
+        """Resolve DNS and open a TLS connection to the API so the first batch skips the handshake."""
+        try:
+            await client.models.list()
+            self.logger.info("OpenAI connection warmed up")
+        except Exception as e:
+            self.logger.warning("OpenAI warmup failed: %s", e)
+
+    async def close(self):
+        """Write out queued transcripts, then close the pooled connections of the OpenAI client."""
+        if self._save_worker is not None:
+            await self._save_queue.join()
+            self._save_worker.cancel()
+            self._save_worker = None
+        await client.close()
 
     async def transcribe_audio(self, audio_bytes: bytes, session_id: str, chunk_count: int, language: str = "en") -> Dict[str, Any]:
         """Transcribe WAV bytes using OpenAI Whisper API. Assumes bytes are valid WAV."""
-        self.logger.debug(f"transcribe_audio called with language: {language} for session: {session_id}")
-        temp_wav_path = None
+        self.logger.debug("transcribe_audio called with language: %s for session: %s", language, session_id)
 
         try:
-            # Create temporary WAV file for this batch
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            temp_wav_path = self.TRANSCRIPTIONS_DIR / f"temp_audio_{session_id}_{timestamp}.wav"
+            ensure_transcriptions_dir()
 
-            with open(temp_wav_path, "wb") as wav_file:
-                wav_file.write(audio_bytes)
+            if Config.DEBUG_SAVE_AUDIO:
+                debug_wav_path = self.TRANSCRIPTIONS_DIR / f"debug_audio_{session_id}_{next(self._debug_audio_counter):08x}.wav"
+                debug_wav_path.write_bytes(audio_bytes)
+                self.logger.debug("Saved batch audio to %s", debug_wav_path)
 
-            # Basic diagnostics: read WAV params to estimate duration
+            # Basic diagnostics: read WAV params from the chunks in memory to estimate duration
             estimated_duration = None
             try:
-                import wave, contextlib
-                with contextlib.closing(wave.open(str(temp_wav_path), 'rb')) as wf:
-                    frames = wf.getnframes()
-                    rate = wf.getframerate() or 16000
-                    estimated_duration = frames / float(rate)
-                    self.logger.debug(f"WAV diagnostics: channels={wf.getnchannels()} sampwidth={wf.getsampwidth()} framerate={wf.getframerate()} frames={frames} duration~{estimated_duration:.2f}s")
+                channels, rate, byte_rate, bits, data_size = _wav_params(audio_bytes)
+                frames = data_size // (channels * (bits // 8))
+                estimated_duration = data_size / float(byte_rate)
+                self.logger.debug(
+                    "WAV diagnostics: channels=%s sampwidth=%s framerate=%s frames=%s duration~%.2fs",
+                    channels, bits // 8, rate, frames, estimated_duration,
+                )
             except Exception as diag_err:
-                self.logger.warning(f"WAV diagnostics failed: {diag_err}")
+                self.logger.warning("WAV diagnostics failed: %s", diag_err)
                 estimated_duration = chunk_count * 0.25
 
-            self.logger.info(f"Transcribing {len(audio_bytes)} bytes (estimated {estimated_duration:.2f}s) using Whisper API...")
+            self.logger.info("Transcribing %d bytes (estimated %.2fs) using Whisper API...", len(audio_bytes), estimated_duration)
 
-            # Transcribe
-            with open(temp_wav_path, "rb") as audio_file:
-                response = client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio_file,
-                    language=language,
-                    response_format="verbose_json"
-                )
+            # Transcribe straight from memory; the SDK takes a (filename, content, mime) tuple.
+            # Plain json: only the text is used (duration comes from the WAV header and the
+            # language is fixed by the session), so per-segment detail is not requested.
+            # whisper-1 rejects stream=True; batches are sent while recording instead
+            response = await client.audio.transcriptions.create(
+                model="whisper-1",
+                file=(f"audio_{session_id}.wav", audio_bytes, "audio/wav"),
+                language=language,
+                response_format="json"
+            )
 
             transcription_text = response.text
-            self.logger.info(f"WAV transcription successful: {len(transcription_text)} characters")
+            self.logger.info("WAV transcription successful: %d characters", len(transcription_text))
 
             # Create transcription result
-            detected_language = getattr(response, 'language', None)
-            self.logger.debug(f"Using language '{language}' for result (detected: {detected_language})")
             result = {
                 "text": transcription_text,
                 "confidence": 0.95,
@@ -75,18 +142,17 @@ class TranscriptionService:
                 "audio_size_bytes": len(audio_bytes),
                 "model": "whisper-1",
                 "language": language,  # Use the language parameter passed from the session
-                "detected_language": detected_language,  # Store detected language separately if needed
                 "timestamp": datetime.now().isoformat()
             }
 
-            # Save transcription to JSON file
-            await self.save_transcription_to_json(result, session_id, timestamp, language)
+            # Queue the transcript line; the result goes back without waiting for the disk
+            await self.save_transcription_to_json(result, session_id, language)
 
-            self.logger.info(f"Transcription complete: {len(transcription_text)} characters")
+            self.logger.info("Transcription complete: %d characters", len(transcription_text))
             return result
 
         except Exception as e:
-            self.logger.error(f"Error in Whisper transcription: {e}")
+            self.logger.error("Error in Whisper transcription: %s", e)
 
             # Return error result
             return {
@@ -98,17 +164,13 @@ class TranscriptionService:
                 "error": str(e),
                 "timestamp": datetime.now().isoformat()
             }
-        finally:
-            # Clean up temporary WAV file
-            self._cleanup_temp_files(temp_wav_path)
 
-    async def save_transcription_to_json(self, transcription_result: Dict[str, Any], session_id: str, timestamp: str, language: str = "en"):
-        """Save transcription result to session JSON file (accumulate all transcriptions for the session)"""
-        try:
-            # Create filename with only session_id (one file per session)
-            filename = f"transcription_session_{session_id}.json"
-            filepath = self.TRANSCRIPTIONS_DIR / filename
+    async def save_transcription_to_json(self, transcription_result: Dict[str, Any], session_id: str, language: str = "en"):
+        """Queue a transcription result for the session's JSONL transcript (one line per batch)
 
+        The line is written by a background worker; this only waits when the save queue is full.
+        """
+        try:
             # Prepare transcription data for this batch
             transcription_data = {
                 "timestamp": transcription_result["timestamp"],
@@ -119,7 +181,8 @@ class TranscriptionService:
                 "audio_size_bytes": transcription_result["audio_size_bytes"],
                 "model": transcription_result.get("model", "whisper-1"),
                 "language": language,  # Use the language passed from the session
-                "processing_timestamp": datetime.now().isoformat(),
+                # Saved in the same step that produced the result, so its clock read is reused
+                "processing_timestamp": transcription_result["timestamp"],
                 "ready_for_llm": True
             }
 
@@ -127,60 +190,77 @@ class TranscriptionService:
             if "error" in transcription_result:
                 transcription_data["error"] = transcription_result["error"]
 
-            import json
-
-            # Check if session file already exists
-            if filepath.exists():
-                # Read existing session data
-                try:
-                    with open(filepath, "r", encoding="utf-8") as json_file:
-                        session_data = json.load(json_file)
-                except json.JSONDecodeError:
-                    self.logger.warning(f"Existing session file {filepath} is corrupted, creating new one")
-                    session_data = None
-            else:
-                session_data = None
-
-            if session_data:
-                # Append to existing session
-                if "transcriptions" not in session_data:
-                    # Convert old format to new format
-                    session_data["transcriptions"] = [session_data.pop("transcription", {})]
-                    session_data["transcriptions"][0]["timestamp"] = session_data.get("timestamp", transcription_result["timestamp"])
-                    session_data["transcriptions"][0]["processing_timestamp"] = session_data.get("processing_timestamp", datetime.now().isoformat())
-                    session_data["transcriptions"][0]["language"] = session_data["transcriptions"][0].get("language", language)
-
-                # Add new transcription
-                session_data["transcriptions"].append(transcription_data)
-                session_data["last_updated"] = datetime.now().isoformat()
-                session_data["language"] = language  # Update session language if it changed
-            else:
-                # Create new session file
-                session_data = {
-                    "session_id": session_id,
-                    "created_at": datetime.now().isoformat(),
-                    "last_updated": datetime.now().isoformat(),
-                    "language": language,
-                    "transcriptions": [transcription_data]
-                }
-
-            # Write updated session data back to file
-            with open(filepath, "w", encoding="utf-8") as json_file:
-                json.dump(session_data, json_file, indent=2, ensure_ascii=False)
-
-            self.logger.info(f"Transcription saved to session file: {filepath} (total transcriptions: {len(session_data['transcriptions'])})")
+            self._ensure_save_worker()
+            self._pending_saves[session_id] += 1
+            try:
+                await self._save_queue.put((session_id, transcription_data, language))
+            except BaseException:
+                self._pending_saves[session_id] -= 1
+                raise
 
         except Exception as e:
-            self.logger.error(f"Error saving transcription to JSON: {e}")
+            self.logger.error("Error saving transcription to JSON: %s", e)
+
+    async def flush_session_saves(self, session_id: str):
+        """Wait until every transcript line queued for the session is on disk."""
+        async with self._saves_written:
+            await self._saves_written.wait_for(lambda: not self._pending_saves[session_id])
 
-    def _cleanup_temp_files(self, wav_path: Path):
-        """Clean up temporary WAV file"""
-        if wav_path and os.path.exists(wav_path):
+    def _ensure_save_worker(self):
+        """Start the transcript save worker on first use (requires a running loop)."""
+        if self._save_worker is None or self._save_worker.done():
+            self._save_worker = asyncio.create_task(self._drain_save_queue())
+
+    async def _drain_save_queue(self):
+        """Write queued transcript lines in arrival order, up to SAVE_BATCH_SIZE per thread hop."""
+        while True:
+            batch = [await self._save_queue.get()]
+            while len(batch) < self.SAVE_BATCH_SIZE and not self._save_queue.empty():
+                batch.append(self._save_queue.get_nowait())
+            try:
+                # The appends run on a worker thread to keep disk I/O off the event loop
+                filepaths = await asyncio.to_thread(self._append_session_files, batch)
+                for filepath in filepaths:
+                    self.logger.info("Transcription appended to session file: %s", filepath)
+            except Exception as e:
+                self.logger.error("Error saving transcription to JSON: %s", e)
+            finally:
+                for session_id, _, _ in batch:
+                    self._pending_saves[session_id] -= 1
+                    if not self._pending_saves[session_id]:
+                        del self._pending_saves[session_id]
+                    self._save_queue.task_done()
+                async with self._saves_written:
+                    self._saves_written.notify_all()
+
+    def _append_session_files(self, batch: List[Tuple[str, Dict[str, Any], str]]) -> List[Path]:
+        """Append a batch of queued transcript lines; one failed session does not drop the others."""
+        filepaths = []
+        for session_id, transcription_data, language in batch:
             try:
-                os.unlink(wav_path)
-                self.logger.debug(f"Cleaned up temporary file: {wav_path}")
-            except Exception as cleanup_error:
-                self.logger.warning(f"Could not clean up {wav_path}: {cleanup_error}")
+                filepaths.append(self._append_session_file(session_id, transcription_data, language))
+            except Exception as e:
+                self.logger.error("Error saving transcription for session %s: %s", session_id, e)
+        return filepaths
+
+    def _append_session_file(self, session_id: str, transcription_data: Dict[str, Any], language: str) -> Path:
+        """Append one transcription line, writing the header sidecar on the session's first batch"""
+        meta_path = file_service.session_meta_path(session_id)
+        if not meta_path.exists():
+            # Written aside and renamed into place, so readers never see a partial sidecar
+            tmp_path = meta_path.with_name(meta_path.name + ".tmp")
+            tmp_path.write_bytes(orjson.dumps({
+                "session_id": session_id,
+                "created_at": transcription_data["processing_timestamp"],
+                "language": language,
+            }))
+            os.replace(tmp_path, meta_path)
+
+        filepath = file_service.session_transcript_path(session_id)
+        with open(filepath, "ab") as jsonl_file:
+            jsonl_file.write(orjson.dumps(transcription_data) + b"\n")
+        file_service.invalidate_listing()
+        return filepath
 
 
 # Global instance
@@ -1,19 +1,40 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
 from app.config import Config
 from app.routes import health_router, transcriptions_router, audio_router
+from app.services import azure_blob_service, transcription_service
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Provision the blob container in the background so startup never waits on Azure
+    container_task = asyncio.create_task(azure_blob_service.initialize())
+    # Likewise prime the OpenAI connection pool so the first transcription skips DNS/TLS
+    warmup_task = asyncio.create_task(transcription_service.warmup())
+    yield
+    container_task.cancel()
+    warmup_task.cancel()
+    # Release the pooled Azure and OpenAI connections
+    await azure_blob_service.close()
+    await transcription_service.close()
+
 
 # Create FastAPI application
-app = FastAPI(title="VoiceSportStat Backend")
+app = FastAPI(title="VoiceSportStat Backend", default_response_class=ORJSONResponse, lifespan=lifespan)
 
 # Add CORS middleware to allow frontend connections
 app.add_middleware(
     CORSMiddleware,
     allow_origins=Config.CORS_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    # Only the read-only REST routes are reached cross-origin (the websocket is not subject to CORS)
+    allow_methods=["GET"],
+    allow_headers=["Content-Type"],
 )
 
 # Include routers
@@ -36,5 +57,14 @@ app.include_router(
 )
 
 if __name__ == "__main__":
+    import sys
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(
+        "main:app",  # import string, so worker processes can load the app themselves
+        host="0.0.0.0",
+        port=8000,
+        workers=Config.SERVER_WORKERS,
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+        ws="websockets",
+    )
\ No newline at end of file
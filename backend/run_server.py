@@ -3,6 +3,8 @@
 Simple script to run the FastAPI server with uvicorn
 """
 
+import sys
+
 import uvicorn
 
 if __name__ == "__main__":
@@ -11,5 +13,8 @@ if __name__ == "__main__":
         host="0.0.0.0",
         port=8000,
         reload=True,  # Enable auto-reload for development
+        loop="asyncio" if sys.platform == "win32" else "uvloop",  # uvloop has no Windows support
+        http="httptools",
+        ws="websockets",  # websockets>=12 protocol implementation for the audio stream
         log_level="info"
     )
@@ -0,0 +1,5 @@
+import os
+
+# The OpenAI client is built at import time and refuses to start without a key;
+# no test talks to the API
+os.environ.setdefault("OPENAI_API_KEY", "test")
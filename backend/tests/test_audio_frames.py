@@ -0,0 +1,101 @@
+"""Wire-format checks for the binary audio frames and the WAV helpers."""
+
+import io
+import struct
+import wave
+
+import pytest
+
+from app.services.audio_service import AUDIO_FRAME_HEADER, audio_service
+
+# Same vector as encodeAudioFrame's test in client/src/lib/MediaRecorder/MediaRecorder.test.ts:
+# sequence 0x01020304, timestamp 0x010203040506, mime code 2 (WebM), then 3 audio bytes
+CLIENT_FRAME = bytes.fromhex("04030201" "0605040302010000" "02" "000000" "aabbcc")
+
+
+def make_wav(pcm: bytes, rate: int = 16000, channels: int = 1) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav_file:
+        wav_file.setnchannels(channels)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(rate)
+        wav_file.writeframes(pcm)
+    return buffer.getvalue()
+
+
+def test_frame_header_layout():
+    assert AUDIO_FRAME_HEADER.size == 16
+    assert AUDIO_FRAME_HEADER.pack(0x01020304, 0x010203040506, 2) == CLIENT_FRAME[:16]
+
+
+def test_parse_client_frame():
+    sequence_number, timestamp, mime_type, audio = audio_service._parse_audio_frame(CLIENT_FRAME)
+    assert (sequence_number, timestamp, mime_type) == (0x01020304, 0x010203040506, "audio/webm")
+    assert isinstance(audio, memoryview)
+    assert bytes(audio) == b"\xaa\xbb\xcc"
+
+
+@pytest.mark.parametrize(
+    "mime_code, mime_type",
+    [(1, "audio/wav"), (2, "audio/webm"), (3, "audio/ogg"), (4, "audio/mpeg"), (5, "audio/pcm"),
+     (0, "application/octet-stream"), (99, "application/octet-stream")],
+)
+def test_parse_mime_codes(mime_code, mime_type):
+    frame = AUDIO_FRAME_HEADER.pack(7, 1_760_000_000_123, mime_code)
+    sequence_number, timestamp, parsed_mime, audio = audio_service._parse_audio_frame(frame)
+    assert (sequence_number, timestamp, parsed_mime) == (7, 1_760_000_000_123, mime_type)
+    assert len(audio) == 0
+
+
+def test_parse_short_frame():
+    with pytest.raises(ValueError):
+        audio_service._parse_audio_frame(CLIENT_FRAME[:15])
+
+
+def test_wav_header_matches_target_format():
+    pcm = bytes(range(256)) * 4
+    header = audio_service._wav_header(len(pcm))
+    assert len(header) == 44
+    with wave.open(io.BytesIO(bytes(header) + pcm), "rb") as wav_file:
+        assert wav_file.getnchannels() == 1
+        assert wav_file.getsampwidth() == 2
+        assert wav_file.getframerate() == 16000
+        assert wav_file.getnframes() == len(pcm) // 2
+        assert wav_file.readframes(wav_file.getnframes()) == pcm
+
+
+def test_wav_from_pcm_chunks_joins_in_order():
+    chunks = [b"\x01\x00" * 10, b"\x02\x00" * 5, b"\x03\x00"]
+    pcm_len = sum(map(len, chunks))
+    wav_bytes = audio_service._wav_from_pcm_chunks(chunks, pcm_len)
+    assert wav_bytes == bytes(audio_service._wav_header(pcm_len)) + b"".join(chunks)
+
+
+def test_strip_wav_header_round_trip():
+    pcm = b"\x10\x20" * 800
+    assert audio_service._try_strip_wav_header(make_wav(pcm)) == pcm
+    assert audio_service._try_strip_wav_header(audio_service._wav_from_pcm_chunks([pcm], len(pcm))) == pcm
+
+
+def test_strip_wav_header_skips_extra_chunks():
+    pcm = b"\x01\x02" * 100
+    wav_bytes = make_wav(pcm)
+    # Insert an odd-sized LIST chunk (plus its pad byte) between fmt and data
+    extra = b"LIST" + struct.pack("<I", 3) + b"abc\x00"
+    data_offset = wav_bytes.index(b"data")
+    patched = bytearray(wav_bytes[:data_offset] + extra + wav_bytes[data_offset:])
+    struct.pack_into("<I", patched, 4, len(patched) - 8)
+    assert audio_service._try_strip_wav_header(bytes(patched)) == pcm
+
+
+def test_strip_wav_header_keeps_whole_frames_of_truncated_data():
+    pcm = b"\x01\x02" * 100
+    assert audio_service._try_strip_wav_header(make_wav(pcm)[:-1]) == pcm[:-2]
+
+
+@pytest.mark.parametrize(
+    "audio_bytes",
+    [make_wav(b"\x00\x00" * 100, rate=44100), make_wav(b"\x00\x00" * 100, channels=2), b"OggS" + bytes(40), b""],
+)
+def test_strip_wav_header_rejects_other_audio(audio_bytes):
+    assert audio_service._try_strip_wav_header(audio_bytes) is None
@@ -0,0 +1,48 @@
+import { describe, it, expect } from 'vitest';
+import { AUDIO_FRAME_HEADER_SIZE, audioMimeCode, encodeAudioFrame } from './MediaRecorder';
+
+describe('audioMimeCode', () => {
+	it('maps each supported format to its backend mime code', () => {
+		expect(audioMimeCode('audio/wav')).toBe(1);
+		expect(audioMimeCode('audio/webm;codecs=opus')).toBe(2);
+		expect(audioMimeCode('audio/ogg;codecs=opus')).toBe(3);
+		expect(audioMimeCode('audio/mpeg')).toBe(4);
+		expect(audioMimeCode('audio/mp3')).toBe(4);
+		expect(audioMimeCode('audio/pcm')).toBe(5);
+	});
+
+	it('is case-insensitive and falls back to 0 for unknown formats', () => {
+		expect(audioMimeCode('Audio/WebM')).toBe(2);
+		expect(audioMimeCode('audio/flac')).toBe(0);
+		expect(audioMimeCode('')).toBe(0);
+	});
+});
+
+describe('encodeAudioFrame', () => {
+	it('writes a 16-byte little-endian header followed by the audio', () => {
+		const audio = new Uint8Array([0xaa, 0xbb, 0xcc]).buffer;
+		const frame = new Uint8Array(encodeAudioFrame(0x01020304, 0x0000_0102_0304_0506, 2, audio));
+
+		expect(AUDIO_FRAME_HEADER_SIZE).toBe(16);
+		expect(frame.byteLength).toBe(16 + 3);
+		// sequence number, u32 LE at offset 0
+		expect(Array.from(frame.slice(0, 4))).toEqual([0x04, 0x03, 0x02, 0x01]);
+		// timestamp in ms, u64 LE at offset 4
+		expect(Array.from(frame.slice(4, 12))).toEqual([0x06, 0x05, 0x04, 0x03, 0x02, 0x01, 0x00, 0x00]);
+		// mime code u8 at offset 12, then 3 zero padding bytes
+		expect(frame[12]).toBe(2);
+		expect(Array.from(frame.slice(13, 16))).toEqual([0, 0, 0]);
+		expect(Array.from(frame.slice(16))).toEqual([0xaa, 0xbb, 0xcc]);
+	});
+
+	it('round-trips realistic values through a DataView', () => {
+		const timestamp = 1_760_000_000_123;
+		const frame = encodeAudioFrame(4_294_967_295, timestamp, 5, new ArrayBuffer(0));
+		const header = new DataView(frame);
+
+		expect(frame.byteLength).toBe(AUDIO_FRAME_HEADER_SIZE);
+		expect(header.getUint32(0, true)).toBe(4_294_967_295);
+		expect(header.getBigUint64(4, true)).toBe(BigInt(timestamp));
+		expect(header.getUint8(12)).toBe(5);
+	});
+});
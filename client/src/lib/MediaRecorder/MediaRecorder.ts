@@ -1,3 +1,5 @@
+import { PcmCapture, PCM_MIME_TYPE } from './PcmCapture';
+
 export interface AudioChunk {
 	data: Blob;
 	timestamp: number;
@@ -6,6 +8,7 @@ export interface AudioChunk {
 
 export interface MediaRecorderConfig {
 	mimeType?: string;
+	captureMode?: 'pcm' | 'mediarecorder'; // 'pcm' = raw 16 kHz PCM via AudioWorklet when supported
 	audioBitsPerSecond?: number;
 	chunkInterval?: number; // milliseconds between chunks
 	websocketUrl?: string;
@@ -36,11 +39,17 @@ export interface TranscriptionResult {
 	processedAt: string;
 }
 
-export interface AudioAck {
+export interface ChunkAck {
 	sequenceNumber: number;
 	timestamp: number;
-	message: string;
+}
+
+export interface AudioAck {
+	sequenceNumber: number; // last chunk covered by this ack
+	timestamp: number;
 	processedAt: string;
+	count: number; // number of chunks acknowledged at once
+	acks: ChunkAck[];
 }
 
 export interface BatchTranscriptionResult {
@@ -63,24 +72,62 @@ export interface RecordingSummary {
 	timestamp: string;
 }
 
+// Binary audio frame header: sequence number (u32), timestamp in ms (u64),
+// mime code (u8) and 3 bytes of padding, little-endian. Must match the backend.
+export const AUDIO_FRAME_HEADER_SIZE = 16;
+
+export const audioMimeCode = (mimeType: string): number => {
+	const mime = mimeType.toLowerCase();
+	if (mime.includes('wav')) return 1;
+	if (mime.includes('webm')) return 2;
+	if (mime.includes('ogg')) return 3;
+	if (mime.includes('mpeg') || mime.includes('mp3')) return 4;
+	if (mime.includes('pcm')) return 5;
+	return 0;
+};
+
+/**
+ * Build one binary audio frame: the 16-byte header followed by the audio bytes
+ */
+export const encodeAudioFrame = (
+	sequenceNumber: number,
+	timestamp: number,
+	mimeCode: number,
+	audio: ArrayBuffer
+): ArrayBuffer => {
+	const frame = new Uint8Array(AUDIO_FRAME_HEADER_SIZE + audio.byteLength);
+	const header = new DataView(frame.buffer, 0, AUDIO_FRAME_HEADER_SIZE);
+	header.setUint32(0, sequenceNumber, true);
+	header.setBigUint64(4, BigInt(timestamp), true);
+	header.setUint8(12, mimeCode);
+	frame.set(new Uint8Array(audio), AUDIO_FRAME_HEADER_SIZE);
+	return frame.buffer;
+};
+
 export class VoiceMediaRecorder {
 	private mediaRecorder: MediaRecorder | null = null;
+	private pcmCapture: PcmCapture | null = null;
 	private mediaStream: MediaStream | null = null;
 	private websocket: WebSocket | null = null;
 	private sequenceNumber = 0;
 	private isRecording = false;
 	private hasPermission = false;
 	private config: Required<MediaRecorderConfig>;
+	// Format actually being sent; PCM capture uses it without touching config.mimeType
+	private activeMimeType: string;
 	private events: MediaRecorderEvents;
+	private textDecoder = new TextDecoder();
 
 	constructor(config: MediaRecorderConfig = {}, events: MediaRecorderEvents = {}) {
 		this.config = {
 			mimeType: config.mimeType || 'audio/wav',
+			captureMode: config.captureMode || 'pcm',
 			audioBitsPerSecond: config.audioBitsPerSecond || 128000,
 			chunkInterval: config.chunkInterval || 250,
 			websocketUrl: config.websocketUrl || '',
 			language: config.language || 'en' // default to English
 		};
+		this.activeMimeType = this.config.mimeType;
 		this.events = events;
 	}
 
@@ -130,6 +177,8 @@ export class VoiceMediaRecorder {
 		return new Promise((resolve) => {
 			try {
 				this.websocket = new WebSocket(wsUrl);
+				// The server sends its JSON messages as binary UTF-8 frames
+				this.websocket.binaryType = 'arraybuffer';
 
 				this.websocket.onopen = () => {
 					this.events.onWebSocketConnected?.();
@@ -188,6 +237,21 @@ export class VoiceMediaRecorder {
 				}
 			}
 
+			if (this.config.captureMode === 'pcm' && PcmCapture.isSupported()) {
+				// Raw 16 kHz PCM needs no decoding on the server
+				this.activeMimeType = PCM_MIME_TYPE;
+				console.log(`Using audio format: ${this.activeMimeType}`);
+
+				const capture = new PcmCapture((pcm) => this.handlePcmChunk(pcm));
+				await capture.start(this.mediaStream!, this.config.chunkInterval);
+				this.pcmCapture = capture;
+				this.isRecording = true;
+
+				this.sendStartRecordingMessage(languageToUse);
+				this.events.onStart?.();
+				return true;
+			}
+
 			// Check if the browser supports the desired mime type
 			if (!MediaRecorder.isTypeSupported(this.config.mimeType)) {
 				// Fallback to a more widely supported format
@@ -201,7 +265,8 @@ export class VoiceMediaRecorder {
 				}
 			}
 
-			console.log(`Using audio format: ${this.config.mimeType}`);
+			this.activeMimeType = this.config.mimeType;
+			console.log(`Using audio format: ${this.activeMimeType}`);
 
 			this.mediaRecorder = new MediaRecorder(this.mediaStream!, {
 				mimeType: this.config.mimeType,
@@ -256,13 +321,34 @@ export class VoiceMediaRecorder {
 	 * Stop recording audio
 	 */
 	stopRecording(): void {
-		if (!this.isRecording || !this.mediaRecorder) {
+		if (!this.isRecording || (!this.mediaRecorder && !this.pcmCapture)) {
 			console.warn('No recording in progress');
 			return;
 		}
 
-		this.mediaRecorder.stop();
+		if (this.pcmCapture) {
+			// Flush the last partial PCM chunk before telling the server the recording ended
+			const capture = this.pcmCapture;
+			this.pcmCapture = null;
+			capture
+				.stop()
+				.catch((error) => console.error('Failed to stop PCM capture:', error))
+				.finally(() => {
+					this.isRecording = false;
+					this.events.onStop?.();
+					this.finishRecording();
+				});
+			return;
+		}
+
+		this.mediaRecorder!.stop();
+		this.finishRecording();
+	}
 
+	/**
+	 * End the server session once no more audio will be sent
+	 */
+	private finishRecording(): void {
 		// Send end recording message to server
 		this.sendEndRecordingMessage();
 
@@ -321,24 +407,31 @@ export class VoiceMediaRecorder {
 	/**
 	 * Handle incoming WebSocket messages from the server
 	 */
-	private handleWebSocketMessage(data: string): void {
+	private handleWebSocketMessage(data: string | ArrayBuffer): void {
 		try {
-			const message = JSON.parse(data);
+			const message = JSON.parse(
+				typeof data === 'string' ? data : this.textDecoder.decode(data)
+			);
 
 			switch (message.type) {
 				case 'connection':
 					console.log('WebSocket connected:', message.message);
 					break;
 
-				case 'audio_ack':
-					console.log(`Audio chunk ${message.sequenceNumber} acknowledged`);
+				case 'batch_ack': {
+					const acks: ChunkAck[] = message.acks ?? [];
+					const last = acks[acks.length - 1];
+					if (!last) break;
+					console.log(`Audio chunks up to ${last.sequenceNumber} acknowledged (${acks.length})`);
 					this.events.onAudioAck?.({
-						sequenceNumber: message.sequenceNumber,
-						timestamp: message.timestamp,
-						message: message.message,
-						processedAt: message.processed_at
+						sequenceNumber: last.sequenceNumber,
+						timestamp: last.timestamp,
+						processedAt: message.processed_at,
+						count: acks.length,
+						acks
 					});
 					break;
+				}
 
 				case 'transcription':
 					console.log(`Transcription for chunk ${message.sequenceNumber}:`, message.text);
@@ -402,6 +495,36 @@ export class VoiceMediaRecorder {
 		}
 	}
 
+	/**
+	 * Handle a raw PCM chunk from the AudioWorklet capture
+	 */
+	private handlePcmChunk(pcm: ArrayBuffer): void {
+		const sequenceNumber = this.sequenceNumber++;
+		const timestamp = Date.now();
+
+		if (this.websocket && this.websocket.readyState === WebSocket.OPEN) {
+			this.sendAudioFrame(sequenceNumber, timestamp, pcm);
+		}
+
+		// Only wrap the samples in a Blob when someone is listening
+		if (this.events.onDataAvailable) {
+			this.events.onDataAvailable({
+				data: new Blob([pcm], { type: PCM_MIME_TYPE }),
+				timestamp,
+				sequenceNumber
+			});
+		}
+	}
+
+	/**
+	 * Send one binary audio frame (header + audio bytes) to the WebSocket server
+	 */
+	private sendAudioFrame(sequenceNumber: number, timestamp: number, audio: ArrayBuffer): void {
+		this.websocket!.send(
+			encodeAudioFrame(sequenceNumber, timestamp, audioMimeCode(this.activeMimeType), audio)
+		);
+	}
+
 	/**
 	 * Send audio chunk to WebSocket server
 	 */
@@ -416,15 +539,7 @@ export class VoiceMediaRecorder {
 			chunk.data
 				.arrayBuffer()
 				.then((arrayBuffer) => {
-					const message = {
-						type: 'audio_chunk',
-						data: Array.from(new Uint8Array(arrayBuffer)),
-						timestamp: chunk.timestamp,
-						sequenceNumber: chunk.sequenceNumber,
-						mimeType: this.config.mimeType
-					};
-
-					this.websocket!.send(JSON.stringify(message));
+					this.sendAudioFrame(chunk.sequenceNumber, chunk.timestamp, arrayBuffer);
 				})
 				.catch((error) => {
 					console.error('Failed to convert blob to array buffer:', error);
@@ -450,8 +565,13 @@ export class VoiceMediaRecorder {
 	 * Clean up resources
 	 */
 	cleanup(): void {
-		this.stopRecording();
-		this.disconnectWebSocket();
+		if (this.isRecording) {
+			// stopRecording disconnects once the end message is sent; with PCM capture
+			// that only happens after the last chunk has been flushed
+			this.stopRecording();
+		} else {
+			this.disconnectWebSocket();
+		}
 
 		if (this.mediaStream) {
 			this.mediaStream.getTracks().forEach((track) => track.stop());
@@ -477,7 +597,7 @@ export class VoiceMediaRecorder {
 			isRecording: this.isRecording,
 			hasPermission: this.hasPermission,
 			websocketConnected: this.websocket?.readyState === WebSocket.OPEN,
-			mimeType: this.config.mimeType
+			mimeType: this.activeMimeType
 		};
 	}
 
@@ -0,0 +1,178 @@
+/**
+ * Raw PCM capture via AudioWorklet
+ * Produces 16 kHz mono PCM S16LE chunks, the format the backend sends to Whisper,
+ * so the server can use them without decoding a container
+ */
+
+export const PCM_SAMPLE_RATE = 16000;
+export const PCM_MIME_TYPE = 'audio/pcm';
+
+const PROCESSOR_NAME = 'pcm-capture';
+
+// Low-pass cutoff for the fallback path, a little under the 8 kHz target Nyquist frequency
+const ANTI_ALIAS_CUTOFF_HZ = 7200;
+
+// Runs on the audio rendering thread: converts the first input channel to Int16 and posts
+// one buffer per chunk. When the context could not be opened at the target rate, the
+// (already low-passed) input is downsampled by linear interpolation; otherwise step is 1
+const PROCESSOR_SOURCE = `
+class PcmCaptureProcessor extends AudioWorkletProcessor {
+	constructor(options) {
+		super();
+		const { targetRate, chunkSamples } = options.processorOptions;
+		this.step = sampleRate / targetRate;
+		this.chunkSamples = chunkSamples;
+		this.position = 0; // read position; index 0 is the last sample of the previous block
+		this.previous = 0;
+		this.buffer = new Int16Array(chunkSamples);
+		this.length = 0;
+		this.port.onmessage = (event) => {
+			if (event.data === 'flush') {
+				this.post();
+				this.port.postMessage('flushed');
+			}
+		};
+	}
+
+	post() {
+		if (this.length === 0) return;
+		const chunk = this.buffer.slice(0, this.length);
+		this.port.postMessage(chunk.buffer, [chunk.buffer]);
+		this.length = 0;
+	}
+
+	process(inputs) {
+		const channel = inputs[0] && inputs[0][0];
+		if (!channel || channel.length === 0) return true;
+
+		while (this.position < channel.length) {
+			const index = Math.floor(this.position);
+			const a = index === 0 ? this.previous : channel[index - 1];
+			const b = channel[index];
+			let sample = a + (b - a) * (this.position - index);
+			sample = Math.max(-1, Math.min(1, sample));
+			this.buffer[this.length++] = sample < 0 ? sample * 0x8000 : sample * 0x7fff;
+			if (this.length === this.chunkSamples) this.post();
+			this.position += this.step;
+		}
+		this.position -= channel.length;
+		this.previous = channel[channel.length - 1];
+		return true;
+	}
+}
+
+registerProcessor('${PROCESSOR_NAME}', PcmCaptureProcessor);
+`;
+
+export class PcmCapture {
+	private context: AudioContext | null = null;
+	private source: MediaStreamAudioSourceNode | null = null;
+	private node: AudioWorkletNode | null = null;
+	private onFlushed: (() => void) | null = null;
+	private onChunk: (pcm: ArrayBuffer) => void;
+
+	constructor(onChunk: (pcm: ArrayBuffer) => void) {
+		this.onChunk = onChunk;
+	}
+
+	/**
+	 * Check whether the browser can capture through an AudioWorklet
+	 */
+	static isSupported(): boolean {
+		return typeof AudioContext !== 'undefined' && typeof AudioWorkletNode !== 'undefined';
+	}
+
+	/**
+	 * Start capturing the stream, emitting one PCM chunk every chunkInterval milliseconds
+	 */
+	async start(stream: MediaStream, chunkInterval: number): Promise<void> {
+		const { context, source } = PcmCapture.openSource(stream);
+		const moduleUrl = URL.createObjectURL(
+			new Blob([PROCESSOR_SOURCE], { type: 'application/javascript' })
+		);
+		try {
+			await context.audioWorklet.addModule(moduleUrl);
+		} catch (error) {
+			await context.close();
+			throw error;
+		} finally {
+			URL.revokeObjectURL(moduleUrl);
+		}
+
+		const node = new AudioWorkletNode(context, PROCESSOR_NAME, {
+			numberOfInputs: 1,
+			numberOfOutputs: 1,
+			processorOptions: {
+				targetRate: PCM_SAMPLE_RATE,
+				chunkSamples: Math.max(1, Math.round((PCM_SAMPLE_RATE * chunkInterval) / 1000))
+			}
+		});
+		node.port.onmessage = (event) => {
+			if (event.data instanceof ArrayBuffer) {
+				this.onChunk(event.data);
+			} else if (event.data === 'flushed') {
+				this.onFlushed?.();
+			}
+		};
+
+		if (context.sampleRate === PCM_SAMPLE_RATE) {
+			source.connect(node);
+		} else {
+			// Remove everything above the target Nyquist frequency before the worklet
+			// decimates, so it doesn't alias into the speech band
+			const filters = [0, 1].map(() =>
+				new BiquadFilterNode(context, { type: 'lowpass', frequency: ANTI_ALIAS_CUTOFF_HZ })
+			);
+			source.connect(filters[0]).connect(filters[1]).connect(node);
+		}
+		// The processor writes no output; the connection only keeps it in the rendered graph
+		node.connect(context.destination);
+		await context.resume();
+
+		this.context = context;
+		this.source = source;
+		this.node = node;
+	}
+
+	/**
+	 * Open an audio context on the stream, at the target rate where the browser allows it
+	 */
+	private static openSource(stream: MediaStream): {
+		context: AudioContext;
+		source: MediaStreamAudioSourceNode;
+	} {
+		let context: AudioContext | null = null;
+		try {
+			// The browser's own resampler band-limits the microphone signal to 16 kHz
+			context = new AudioContext({ sampleRate: PCM_SAMPLE_RATE });
+			return { context, source: context.createMediaStreamSource(stream) };
+		} catch {
+			// Some browsers (e.g. Firefox) can't connect a stream to a context at another rate
+			void context?.close();
+			context = new AudioContext();
+			return { context, source: context.createMediaStreamSource(stream) };
+		}
+	}
+
+	/**
+	 * Stop capturing; resolves once the last partial chunk has been emitted
+	 */
+	async stop(): Promise<void> {
+		const node = this.node;
+		if (node) {
+			await new Promise<void>((resolve) => {
+				this.onFlushed = resolve;
+				node.port.postMessage('flush');
+			});
+			node.port.onmessage = null;
+			node.disconnect();
+		}
+		this.source?.disconnect();
+		await this.context?.close();
+
+		this.context = null;
+		this.source = null;
+		this.node = null;
+		this.onFlushed = null;
+	}
+}
@@ -9,6 +9,7 @@ export {
 	type MediaRecorderEvents,
 	type TranscriptionResult,
 	type AudioAck,
+	type ChunkAck,
 	type BatchTranscriptionResult,
 	type BatchProcessingStatus,
 	type RecordingSummary